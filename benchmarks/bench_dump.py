@@ -0,0 +1,82 @@
+"""Benchmark `Schema.dump` with and without `Schema.compile_dump`.
+
+Usage: ::
+
+    python benchmarks/bench_dump.py [--objects 1000] [--repeat 20]
+"""
+
+import argparse
+import timeit
+
+from flask import Flask
+
+from flask_marshmallow import Marshmallow
+
+
+def make_app():
+    app = Flask("bench")
+    ma = Marshmallow(app)
+
+    @app.route("/authors/<int:id>")
+    def author(id):
+        return ""
+
+    class FlatSchema(ma.Schema):
+        id = ma.Int()
+        name = ma.Str()
+        email = ma.Str()
+        bio = ma.Str()
+        score = ma.Float()
+        active = ma.Bool()
+        rank = ma.Int()
+
+    class LinkedSchema(FlatSchema):
+        url = ma.URLFor("author", values={"id": "<id>"})
+        links = ma.Hyperlinks({"self": ma.URLFor("author", values={"id": "<id>"})})
+
+    return app, FlatSchema, LinkedSchema
+
+
+def make_authors(count):
+    return [
+        {
+            "id": i,
+            "name": f"Author {i}",
+            "email": f"author{i}@example.com",
+            "bio": "Lorem ipsum dolor sit amet.",
+            "score": i / 7,
+            "active": i % 2 == 0,
+            "rank": i % 100,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app, *schema_classes = make_app()
+    authors = make_authors(args.objects)
+
+    def best(func):
+        return min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+
+    with app.test_request_context():
+        for schema_class in schema_classes:
+            schema = schema_class(many=True)
+            default = best(lambda s=schema: s.dump(authors))
+            compiled_schema = schema_class(many=True)
+            compiled_schema.compile_dump()
+            compiled = best(lambda s=compiled_schema: s.dump(authors))
+            print(
+                f"{schema_class.__name__:>12}: "
+                f"{default * 1000:8.2f} ms/dump, "
+                f"{compiled * 1000:8.2f} ms/dump compiled ({default / compiled:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark the memory forked workers stop sharing with their parent.
+
+Defines many schemas, optionally warms them up (``--mode warm``) or warms
+them up and freezes them (``--mode frozen``) in the parent process, forks
+workers that each serve requests with all the
+schemas, and reports the private (copied-on-write) memory of each worker,
+from ``/proc/<pid>/smaps_rollup``. Linux only.
+
+Usage: ::
+
+    python benchmarks/bench_fork.py [--schemas 200] [--workers 4] [--mode frozen]
+"""
+
+import argparse
+import os
+import sys
+
+from flask import Flask
+
+from flask_marshmallow import Marshmallow
+
+
+def make_app(count):
+    app = Flask("bench")
+    app.config["MARSHMALLOW_SCHEMA_CACHE_SIZE"] = count
+    ma = Marshmallow(app)
+
+    @app.route("/items/<int:id>")
+    def item(id):
+        return ""
+
+    schema_classes = []
+    for i in range(count):
+        attrs = {f"field_{n}": ma.Str() for n in range(20)}
+        attrs["id"] = ma.Int()
+        attrs["links"] = ma.Hyperlinks(
+            {"self": ma.URLFor("item", values={"id": "<id>"})}
+        )
+        if schema_classes:
+            attrs["parent"] = ma.Nested(schema_classes[-1], only=("id", "links"))
+        schema_classes.append(type(f"Schema{i}", (ma.Schema,), attrs))
+    return app, ma, schema_classes
+
+
+def private_kb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        return sum(
+            int(line.split()[1])
+            for line in f
+            if line.startswith(("Private_Clean:", "Private_Dirty:"))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schemas", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--mode", choices=["cold", "warm", "frozen"], default="warm")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("This benchmark requires /proc/<pid>/smaps_rollup (Linux).")
+
+    app, ma, schema_classes = make_app(args.schemas)
+    obj = {f"field_{n}": "value" for n in range(20)}
+    obj.update(id=1, parent={"id": 0})
+    if args.mode != "cold":
+        print(ma.warm_up(app, schema_classes))
+    if args.mode == "frozen":
+        print(ma.freeze(app, gc_freeze=True))
+
+    pids = []
+    for _ in range(args.workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            with app.test_request_context():
+                for _ in range(args.requests):
+                    for schema_class in schema_classes:
+                        ma.get_schema(schema_class).jsonify(obj)
+            os.write(write_fd, str(private_kb("self")).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pids.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in pids:
+        with os.fdopen(read_fd) as f:
+            results.append(int(f.read()))
+        os.waitpid(pid, 0)
+    print(
+        f"{args.mode}: {sum(results) / len(results) / 1024:.1f} MiB private per worker "
+        f"({args.workers} workers)"
+    )
+
+
+if __name__ == "__main__":
+    main()
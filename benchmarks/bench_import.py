@@ -0,0 +1,77 @@
+"""Benchmark the import time of `flask_marshmallow`.
+
+Each sample imports the package in a new interpreter with ``-X importtime``.
+The "dependencies" row imports Flask and marshmallow only, for comparison.
+Exits with status 1 if Flask-SQLAlchemy is imported eagerly, or if importing
+the package takes longer than ``--max-ms``.
+
+Usage: ::
+
+    python benchmarks/bench_import.py [--samples 10] [--max-ms MS]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+EAGER_MODULES = ("flask_sqlalchemy", "marshmallow_sqlalchemy", "sqlalchemy")
+
+
+def measure(statement):
+    """Return the time ``statement`` spends importing modules, in
+    milliseconds, and the names of the modules it imports.
+    """
+    code = f"{statement}\nimport sys\nprint(','.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # Only count top-level imports, whose times include their imports
+        if not fields[2].startswith("  "):
+            total += int(fields[1])
+    return total / 1000, set(result.stdout.strip().split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    failed = False
+    for label, statement in [
+        ("dependencies", "import flask, marshmallow"),
+        ("flask_marshmallow", "import flask_marshmallow"),
+        (
+            "Marshmallow()",
+            "import flask_marshmallow; flask_marshmallow.Marshmallow().String",
+        ),
+    ]:
+        times = []
+        for _ in range(args.samples):
+            elapsed, modules = measure(statement)
+            times.append(elapsed)
+        eager = sorted(set(EAGER_MODULES) & modules)
+        print(
+            f"{label:>18}: {min(times):7.1f} ms min, "
+            f"{statistics.median(times):7.1f} ms median"
+            + (f" (imports {', '.join(eager)})" if eager else "")
+        )
+        if label != "dependencies":
+            failed = failed or bool(eager)
+            if args.max_ms is not None and min(times) > args.max_ms:
+                failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark `Schema.jsonify` with each JSON encoder backend.
+
+Without a backend, `Schema.jsonify` encodes the fields as they are serialized
+(the "fused" row); "dump + jsonify" encodes the result of `dump`.
+
+Usage: ::
+
+    python benchmarks/bench_jsonify.py [--objects 1000] [--repeat 20]
+"""
+
+import argparse
+import datetime as dt
+import importlib.util
+import timeit
+
+from flask import Flask, jsonify
+
+from flask_marshmallow import Marshmallow
+from flask_marshmallow.encoding import set_json_backend
+
+
+def make_app():
+    app = Flask("bench")
+    ma = Marshmallow(app)
+
+    @app.route("/authors/<int:id>")
+    def author(id):
+        return ""
+
+    class AuthorSchema(ma.Schema):
+        id = ma.Int()
+        name = ma.Str()
+        bio = ma.Str()
+        score = ma.Float()
+        tags = ma.List(ma.Str())
+        created = ma.DateTime()
+        url = ma.URLFor("author", values={"id": "<id>"})
+
+    return app, AuthorSchema(many=True)
+
+
+def make_authors(count):
+    created = dt.datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "name": f"Author {i} — é",
+            "bio": "Lorem ipsum dolor sit amet. " * 4,
+            "score": i / 7,
+            "tags": ["fiction", "history", f"tag{i % 10}"],
+            "created": created,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app, schema = make_app()
+    authors = make_authors(args.objects)
+    backends = [None, "json"]
+    if importlib.util.find_spec("orjson"):
+        backends.append("orjson")
+
+    def best(func):
+        return min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+
+    with app.test_request_context():
+        data = schema.dump(authors)
+        total = best(lambda: jsonify(schema.dump(authors)).get_data())
+        print(f"{'dump + jsonify':>14}: {total * 1000:8.2f} ms/jsonify")
+        baseline = None
+        for backend_name in backends:
+            backend = set_json_backend(app, backend_name)
+            if backend is None:
+                encode = best(lambda: jsonify(data).get_data())
+            else:
+                encode = best(lambda b=backend: b.response(data).get_data())
+            total = best(lambda: schema.jsonify(authors).get_data())
+            if baseline is None:
+                baseline = encode
+            print(
+                f"{backend_name or 'fused':>14}: "
+                f"{total * 1000:8.2f} ms/jsonify, "
+                f"{encode * 1000:8.2f} ms/encode ({baseline / encode:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
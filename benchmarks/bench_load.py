@@ -0,0 +1,85 @@
+"""Benchmark `Schema.load` with and without `Schema.compile_load`.
+
+Usage: ::
+
+    python benchmarks/bench_load.py [--objects 1000] [--repeat 20]
+"""
+
+import argparse
+import io
+import timeit
+
+from marshmallow import fields, validate
+from werkzeug.datastructures import FileStorage
+
+from flask_marshmallow import Schema
+from flask_marshmallow.fields import File
+from flask_marshmallow.validate import FileSize, FileType
+
+
+class AuthorSchema(Schema):
+    id = fields.Int(required=True)
+    name = fields.Str(required=True, validate=validate.Length(max=100))
+    email = fields.Str()
+    bio = fields.Str(allow_none=True)
+    active = fields.Bool(load_default=True)
+    rank = fields.Int(validate=validate.Range(min=0))
+    tags = fields.List(fields.Str(), load_default=list)
+
+
+class UploadSchema(Schema):
+    title = fields.Str(required=True)
+    image = File(
+        required=True,
+        validate=[FileSize(max="1 MiB"), FileType([".png", ".jpg"])],
+    )
+
+
+def make_authors(count):
+    return [
+        {
+            "id": i,
+            "name": f"Author {i}",
+            "email": f"author{i}@example.com",
+            "bio": None,
+            "rank": i % 100,
+            "tags": ["a", "b"],
+        }
+        for i in range(count)
+    ]
+
+
+def make_uploads(count):
+    return [
+        {"title": f"Image {i}", "image": FileStorage(io.BytesIO(b"x" * 100), "a.png")}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    def best(func):
+        return min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+
+    for schema_class, data in [
+        (AuthorSchema, make_authors(args.objects)),
+        (UploadSchema, make_uploads(args.objects)),
+    ]:
+        schema = schema_class(many=True)
+        default = best(lambda s=schema, d=data: s.load(d))
+        compiled_schema = schema_class(many=True)
+        compiled_schema.compile_load()
+        compiled = best(lambda s=compiled_schema, d=data: s.load(d))
+        print(
+            f"{schema_class.__name__:>12}: "
+            f"{default * 1000:8.2f} ms/load, "
+            f"{compiled * 1000:8.2f} ms/load compiled ({default / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ Integrates the marshmallow serialization/deserialization library
 with your Flask application.
 """
 
+import importlib
+import sys
+import types
 import typing
 import warnings
 
@@ -13,27 +16,67 @@ from marshmallow import exceptions, pprint
 from marshmallow import fields as base_fields
 
 from . import fields
+from .encoding import set_json_backend
+from .registry import SchemaRegistry, _SchemaT
+from .routing import disable_url_cache, enable_url_cache
 from .schema import Schema
+from .warmup import FreezeReport, WarmUpReport, freeze, warm_up
 
 if typing.TYPE_CHECKING:
     from flask import Flask
 
-has_sqla = False
-try:
-    import flask_sqlalchemy  # noqa: F401
-except ImportError:
-    has_sqla = False
-else:
+#: Whether the Flask-SQLAlchemy integration is available. Resolved on first
+#: access, so that importing this package doesn't import Flask-SQLAlchemy.
+has_sqla: bool
+
+# Attributes of `Marshmallow` provided by the Flask-SQLAlchemy integration
+_SQLA_ATTRS = frozenset(
+    (
+        "SQLAlchemySchema",
+        "SQLAlchemyAutoSchema",
+        "auto_field",
+        "HyperlinkRelated",
+        "HyperlinkRelatedList",
+    )
+)
+
+
+def _import_sqla() -> typing.Optional[types.ModuleType]:
+    """Import and return the `flask_marshmallow.sqla` module, or `None` if
+    Flask-SQLAlchemy or marshmallow-sqlalchemy isn't installed.
+    """
+    global has_sqla
+    if "has_sqla" in globals():
+        return sys.modules[f"{__name__}.sqla"] if has_sqla else None
+    try:
+        import flask_sqlalchemy  # noqa: F401
+    except ImportError:
+        has_sqla = False
+        return None
     try:
-        from . import sqla
+        # Not ``from . import sqla``, which would look up the module attribute
+        sqla = importlib.import_module(f"{__name__}.sqla")
     except ImportError:
         warnings.warn(
             "Flask-SQLAlchemy integration requires "
             "marshmallow-sqlalchemy to be installed.",
-            stacklevel=2,
+            stacklevel=3,
         )
-    else:
-        has_sqla = True
+        has_sqla = False
+        return None
+    has_sqla = True
+    return sqla
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name == "has_sqla":
+        return _import_sqla() is not None
+    if name == "sqla":
+        sqla = _import_sqla()
+        if sqla is not None:
+            return sqla
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "EXTENSION_NAME",
@@ -47,17 +90,6 @@ __all__ = [
 EXTENSION_NAME = "flask-marshmallow"
 
 
-def _attach_fields(obj):
-    """Attach all the marshmallow fields classes to ``obj``, including
-    Flask-Marshmallow's custom fields.
-    """
-    for attr in base_fields.__all__:
-        if not hasattr(obj, attr):
-            setattr(obj, attr, getattr(base_fields, attr))
-    for attr in fields.__all__:
-        setattr(obj, attr, getattr(fields, attr))
-
-
 class Marshmallow:
     """Wrapper class that integrates Marshmallow with a Flask application.
 
@@ -102,30 +134,164 @@ class Marshmallow:
             class Meta:
                 model = Author
 
+    Schema instances can be shared between requests with `get_schema`.
+
+    Fields and the Flask-SQLAlchemy integration are looked up on first access,
+    so neither creating the extension nor importing this package imports
+    Flask-SQLAlchemy.
+
     :param Flask app: The Flask application object.
     """
 
     def __init__(self, app: typing.Optional["Flask"] = None):
         self.Schema = Schema
-        if has_sqla:
-            self.SQLAlchemySchema = sqla.SQLAlchemySchema
-            self.SQLAlchemyAutoSchema = sqla.SQLAlchemyAutoSchema
-            self.auto_field = sqla.auto_field
-            self.HyperlinkRelated = sqla.HyperlinkRelated
-        _attach_fields(self)
+        #: Shared schema instances (see `flask_marshmallow.registry`)
+        self.schemas = SchemaRegistry()
         if app is not None:
             self.init_app(app)
 
-    def init_app(self, app: "Flask"):
+    def __getattr__(self, name: str) -> typing.Any:
+        # Attach marshmallow's fields, Flask-Marshmallow's fields and the
+        # Flask-SQLAlchemy integration on first access
+        if name in fields.__all__:
+            value = getattr(fields, name)
+        elif name in base_fields.__all__:
+            value = getattr(base_fields, name)
+        elif name in _SQLA_ATTRS and (sqla := _import_sqla()) is not None:
+            value = getattr(sqla, name)
+        else:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self) -> typing.Iterable[str]:
+        names = {*super().__dir__(), *fields.__all__, *base_fields.__all__}
+        if _import_sqla() is not None:
+            names.update(_SQLA_ATTRS)
+        return sorted(names)
+
+    def init_app(self, app: "Flask", json_encoder: typing.Any = None):
         """Initializes the application with the extension.
 
+        The following configuration values are used:
+
+        - ``MARSHMALLOW_URL_CACHE_SIZE``: Maximum number of generated URLs to
+          cache per app (see `flask_marshmallow.routing.URLCache`). Defaults to
+          ``0``, which disables the cache.
+        - ``MARSHMALLOW_JSON_ENCODER``: JSON encoder used by
+          `Schema.jsonify`, e.g. ``"orjson"`` (see
+          `flask_marshmallow.encoding.make_json_backend`). Defaults to `None`,
+          which uses `flask.jsonify`.
+        - ``MARSHMALLOW_SCHEMA_CACHE_SIZE``: Maximum number of schema
+          instances kept by `get_schema`. Defaults to ``128``.
+        - ``MARSHMALLOW_WARM_UP``: Whether to call `warm_up` at the end of
+          `init_app`. Defaults to `False`. Schemas and views defined after
+          `init_app` aren't warmed up; call `warm_up` once they are.
+
         :param Flask app: The Flask application object.
+        :param json_encoder: JSON encoder used by `Schema.jsonify`. Overrides
+            ``MARSHMALLOW_JSON_ENCODER``.
         """
         app.extensions = getattr(app, "extensions", {})
 
+        if json_encoder is None:
+            json_encoder = app.config.get("MARSHMALLOW_JSON_ENCODER")
+        set_json_backend(app, json_encoder)
+
+        self.schemas.maxsize = app.config.get(
+            "MARSHMALLOW_SCHEMA_CACHE_SIZE", self.schemas.maxsize
+        )
+
+        url_cache_size = app.config.get("MARSHMALLOW_URL_CACHE_SIZE", 0)
+        if url_cache_size:
+            enable_url_cache(app, url_cache_size)
+        else:
+            disable_url_cache(app)
+
         # If using Flask-SQLAlchemy, attach db.session to SQLAlchemySchema
-        if has_sqla and "sqlalchemy" in app.extensions:
+        if "sqlalchemy" in app.extensions and _import_sqla() is not None:
             db = app.extensions["sqlalchemy"]
             self.SQLAlchemySchema.OPTIONS_CLASS.session = db.session
             self.SQLAlchemyAutoSchema.OPTIONS_CLASS.session = db.session
         app.extensions[EXTENSION_NAME] = self
+
+        if app.config.get("MARSHMALLOW_WARM_UP", False):
+            self.warm_up(app)
+
+    def get_schema(self, schema_class: typing.Type[_SchemaT], **options) -> _SchemaT:
+        """Return a shared instance of ``schema_class`` created with
+        ``options``, instead of instantiating it. ::
+
+            schema = ma.get_schema(AuthorSchema, many=True, only=("id", "name"))
+
+        The instance is shared between threads and requests and must not be
+        modified. See `flask_marshmallow.registry.SchemaRegistry.get`.
+
+        .. versionadded:: 1.3.0
+        """
+        return self.schemas.get(schema_class, **options)
+
+    def warm_up(
+        self,
+        app: "Flask",
+        schema_classes: typing.Optional[typing.Iterable[typing.Type[Schema]]] = None,
+    ) -> WarmUpReport:
+        """Instantiate every registered schema class (or ``schema_classes``)
+        into `schemas`, resolve their nested schemas and compile the URL rules
+        of their hyperlink fields, so that the first requests after startup
+        don't pay for it. ::
+
+            app = create_app()
+            report = ma.warm_up(app)
+
+        The report is logged to ``app.logger`` at the info level, and schema
+        classes that couldn't be instantiated with their default options at
+        the warning level. `schemas` keeps at most
+        ``MARSHMALLOW_SCHEMA_CACHE_SIZE`` instances, so raise it above the
+        number of schema classes to keep all of them. See
+        `flask_marshmallow.warmup.warm_up`.
+
+        .. versionadded:: 1.3.0
+        """
+        report = warm_up(app, self.schemas, schema_classes)
+        app.logger.info("%s", report)
+        for schema_class, error in report.errors.items():
+            app.logger.warning(
+                "Couldn't warm up %s: %r", schema_class.__qualname__, error
+            )
+        return report
+
+    def freeze(self, app: "Flask", gc_freeze: bool = False) -> FreezeReport:
+        """Finalize the schemas in `schemas` and their nested schemas, after
+        `warm_up` and before forking worker processes, so that requests
+        don't modify them and workers keep sharing their memory with the
+        parent process. ::
+
+            ma.warm_up(app)
+            ma.freeze(app, gc_freeze=True)
+
+        Frozen schemas must not be modified: their fields are read-only
+        mappings. Schemas created after `freeze` aren't frozen. The report is
+        logged to ``app.logger`` at the info level, and schemas whose nested
+        schemas couldn't be resolved, and so aren't frozen, at the warning
+        level.
+
+        :param Flask app: The Flask application object.
+        :param bool gc_freeze: Run a garbage collection and move all the objects
+            that survive it to the permanent generation with `gc.freeze`.
+
+        See `flask_marshmallow.warmup.freeze`.
+
+        .. versionadded:: 1.3.0
+        """
+        report = freeze(app, self.schemas, gc_freeze)
+        app.logger.info("%s", report)
+        for schema_class, error in report.errors.items():
+            app.logger.warning(
+                "Couldn't freeze the nested schemas of %s: %r",
+                schema_class.__qualname__,
+                error,
+            )
+        return report
@@ -0,0 +1,482 @@
+"""
+flask_marshmallow.compiler
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Generates specialized dump and load functions for `Schema
+<flask_marshmallow.Schema>` instances. See `Schema.compile_dump
+<flask_marshmallow.Schema.compile_dump>` and `Schema.compile_load
+<flask_marshmallow.Schema.compile_load>`.
+
+marshmallow's `Schema._serialize <marshmallow.Schema>` loops over the fields
+of the schema and calls `Field.serialize <marshmallow.fields.Field.serialize>`
+for each of them, which looks up the value with the schema's accessor, applies
+the default and calls the field's ``_serialize``. The generated function does
+the same work in straight-line code:
+
+- values are read with a getter compiled for each field's attribute;
+- the ``_serialize`` of `Raw <marshmallow.fields.Raw>`, `String
+  <marshmallow.fields.String>`, `Integer <marshmallow.fields.Integer>`,
+  `Float <marshmallow.fields.Float>` and `Boolean <marshmallow.fields.Boolean>`
+  fields is skipped for values that it would return unchanged;
+- fields that don't read an attribute, such as `URLFor
+  <flask_marshmallow.fields.URLFor>`, `Hyperlinks
+  <flask_marshmallow.fields.Hyperlinks>` and `Config
+  <flask_marshmallow.fields.Config>`, have their ``_serialize`` called
+  directly;
+- fields that override ``serialize`` or ``get_value`` are serialized as usual.
+
+The generated load function deserializes a mapping like
+`Schema._deserialize <marshmallow.Schema>`, without an error store:
+
+- required, ``allow_none`` and ``load_default`` are handled inline;
+- `Raw`, `String`, `Integer` and `Boolean` values that ``_deserialize``
+  would return unchanged, and `File <flask_marshmallow.fields.File>` uploads,
+  are used as they are;
+- `FileSize <flask_marshmallow.validate.FileSize>` and `FileType
+  <flask_marshmallow.validate.FileType>` validators are inlined, other
+  validators are called directly;
+- fields that override ``deserialize``, ``_validate`` or ``_validate_missing``
+  are deserialized as usual.
+
+It stops at the first invalid value. The schema then deserializes the data
+again with marshmallow to collect the errors, so that results and error
+messages are the same as without compiling.
+
+The source of each function only depends on the kind of each field, so it is
+generated and compiled once for all the schemas (and ``only``/``exclude``
+variants) with the same shape, and bound to the fields of each instance.
+"""
+
+import functools
+import os
+import typing
+from collections.abc import Sequence
+
+import marshmallow as ma
+from marshmallow import fields as ma_fields
+from marshmallow import missing
+from marshmallow.utils import set_value
+from werkzeug.datastructures import FileStorage
+
+from .fields import Config, File, Hyperlinks, URLFor, _make_value_getter
+from .validate import FileSize, FileType, _get_filestorage_size
+
+# Field classes whose _serialize returns values of this type (and None) as-is
+_PASSTHROUGH_TYPES: typing.Dict[type, typing.Optional[type]] = {
+    ma_fields.Raw: None,
+    ma_fields.String: str,
+    ma_fields.Integer: int,
+    ma_fields.Float: float,
+    ma_fields.Boolean: bool,
+}
+
+# Fields that always return a value from _serialize
+_NEVER_MISSING = (URLFor, Hyperlinks, Config)
+
+_Kind = typing.Tuple[typing.Any, ...]
+
+# Field classes whose _deserialize returns values of this type as-is
+_LOAD_PASSTHROUGH_TYPES: typing.Dict[type, typing.Optional[type]] = {
+    ma_fields.Raw: None,
+    ma_fields.String: str,
+    ma_fields.Integer: int,
+    ma_fields.Boolean: bool,
+}
+
+_factories: typing.Dict[typing.Tuple[_Kind, ...], typing.Callable] = {}
+_load_factories: typing.Dict[typing.Tuple[_Kind, ...], typing.Callable] = {}
+
+
+class _LoadFailed(Exception):
+    """Raised by compiled load functions when the data is invalid."""
+
+
+def _dump_default(field: ma_fields.Field) -> typing.Any:
+    # ``default`` was renamed ``dump_default`` in marshmallow 3.13
+    if hasattr(field, "dump_default"):
+        return field.dump_default
+    return field.default
+
+
+def _load_default(field: ma_fields.Field) -> typing.Any:
+    # ``missing`` was renamed ``load_default`` in marshmallow 3.13
+    if hasattr(field, "load_default"):
+        return field.load_default
+    return field.missing
+
+
+def _field_kind(
+    schema: ma.Schema,
+    index: int,
+    attr_name: str,
+    field: ma_fields.Field,
+    env: typing.Dict[str, typing.Any],
+) -> _Kind:
+    """Return the kind of ``field`` and add the objects its code uses to
+    ``env``.
+    """
+    env[f"k{index}"] = field.data_key if field.data_key is not None else attr_name
+    env[f"a{index}"] = attr_name
+    field_type = type(field)
+    if (
+        field_type.serialize is not ma_fields.Field.serialize
+        or field_type.get_value is not ma_fields.Field.get_value
+    ):
+        env[f"s{index}"] = functools.partial(
+            field.serialize, accessor=schema.get_attribute
+        )
+        return ("serialize",)
+    env[f"s{index}"] = field._serialize
+    if not field._CHECK_ATTRIBUTE:
+        return ("no_attribute", isinstance(field, _NEVER_MISSING))
+    key = attr_name if field.attribute is None else field.attribute
+    if type(schema).get_attribute is not ma.Schema.get_attribute:
+        env[f"g{index}"] = functools.partial(schema.get_attribute, attr=key)
+        getter = "accessor"
+    else:
+        env[f"g{index}"] = _make_value_getter(key)
+        getter = "key"
+    default = _dump_default(field)
+    if default is missing:
+        default_kind = None
+    else:
+        env[f"d{index}"] = default
+        default_kind = "callable" if callable(default) else "value"
+    conversion = "serialize"
+    if field_type in _PASSTHROUGH_TYPES and not getattr(field, "as_string", False):
+        value_type = _PASSTHROUGH_TYPES[field_type]
+        if value_type is None:
+            conversion = "raw"
+        else:
+            env[f"t{index}"] = value_type
+            conversion = "typed"
+    return ("attribute", getter, default_kind, conversion)
+
+
+def _dump_source(kinds: typing.Tuple[_Kind, ...]) -> str:
+    lines = ["def make(env):"]
+    names = ["dict_class", "missing"]
+    for i, kind in enumerate(kinds):
+        names += [f"k{i}", f"a{i}", f"s{i}"]
+        if kind[0] == "attribute":
+            names.append(f"g{i}")
+            if kind[2] is not None:
+                names.append(f"d{i}")
+            if kind[3] == "typed":
+                names.append(f"t{i}")
+    lines.extend(f"    {name} = env[{name!r}]" for name in names)
+    lines.append("    def dump_one(obj):")
+    lines.append("        ret = dict_class()")
+    for i, kind in enumerate(kinds):
+        if kind[0] == "serialize":
+            lines.append(f"        value = s{i}(a{i}, obj)")
+            lines.append("        if value is not missing:")
+            lines.append(f"            ret[k{i}] = value")
+        elif kind[0] == "no_attribute":
+            if kind[1]:
+                lines.append(f"        ret[k{i}] = s{i}(None, a{i}, obj)")
+            else:
+                lines.append(f"        value = s{i}(None, a{i}, obj)")
+                lines.append("        if value is not missing:")
+                lines.append(f"            ret[k{i}] = value")
+        else:
+            _, getter, default_kind, conversion = kind
+            if getter == "accessor":
+                lines.append(f"        value = g{i}(obj, default=missing)")
+            else:
+                lines.append(f"        value = g{i}(obj)")
+            if default_kind is not None:
+                default = f"d{i}()" if default_kind == "callable" else f"d{i}"
+                lines.append("        if value is missing:")
+                lines.append(f"            value = {default}")
+            lines.append("        if value is not missing:")
+            if conversion == "raw":
+                lines.append(f"            ret[k{i}] = value")
+            elif conversion == "typed":
+                lines.append(
+                    f"            ret[k{i}] = value if value is None or "
+                    f"value.__class__ is t{i} else s{i}(value, a{i}, obj)"
+                )
+            else:
+                lines.append(f"            ret[k{i}] = s{i}(value, a{i}, obj)")
+    lines.append("        return ret")
+    lines.append("    return dump_one")
+    return "\n".join(lines) + "\n"
+
+
+def compile_dump(
+    schema: ma.Schema,
+) -> typing.Callable[[typing.Any], typing.Dict[str, typing.Any]]:
+    """Return a function that serializes one object with ``schema``, like
+    ``schema._serialize(obj)``.
+    """
+    env: typing.Dict[str, typing.Any] = {
+        "dict_class": schema.dict_class,
+        "missing": missing,
+    }
+    kinds = tuple(
+        _field_kind(schema, index, attr_name, field, env)
+        for index, (attr_name, field) in enumerate(schema.dump_fields.items())
+    )
+    factory = _factories.get(kinds)
+    if factory is None:
+        namespace: typing.Dict[str, typing.Any] = {}
+        code = compile(_dump_source(kinds), "<flask_marshmallow dump>", "exec")
+        exec(code, namespace)
+        factory = _factories[kinds] = namespace["make"]
+    return factory(env)
+
+
+def _validator_kind(
+    validator: typing.Callable, name: str, env: typing.Dict[str, typing.Any]
+) -> _Kind:
+    if type(validator) is FileSize:
+        env[f"{name}_min"] = validator.min_size
+        env[f"{name}_max"] = validator.max_size
+        return (
+            "file_size",
+            validator.min_size is not None,
+            validator.min_inclusive,
+            validator.max_size is not None,
+            validator.max_inclusive,
+        )
+    if type(validator) is FileType:
+        env[name] = validator.allowed_types
+        return ("file_type",)
+    env[name] = validator
+    return ("call",)
+
+
+def _load_field_kind(
+    index: int,
+    attr_name: str,
+    field: ma_fields.Field,
+    env: typing.Dict[str, typing.Any],
+) -> _Kind:
+    """Return the kind of ``field`` for loading and add the objects its code
+    uses to ``env``.
+    """
+    field_type = type(field)
+    env[f"k{index}"] = field.data_key if field.data_key is not None else attr_name
+    key = env[f"a{index}"] = field.attribute or attr_name
+    dotted = "." in key
+    if field_type is not File and (
+        field_type.deserialize is not ma_fields.Field.deserialize
+        or field_type._validate is not ma_fields.Field._validate
+        or field_type._validate_missing is not ma_fields.Field._validate_missing
+    ):
+        env[f"s{index}"] = field.deserialize
+        return ("deserialize", dotted)
+    default = _load_default(field)
+    if default is missing:
+        default_kind = None
+    else:
+        env[f"d{index}"] = default
+        default_kind = "callable" if callable(default) else "value"
+    conversion = "deserialize"
+    if field_type is File:
+        conversion = "file"
+    elif field_type in _LOAD_PASSTHROUGH_TYPES:
+        value_type = _LOAD_PASSTHROUGH_TYPES[field_type]
+        if value_type is None:
+            conversion = "raw"
+        elif not isinstance(field, ma_fields.Boolean) or (
+            True in field.truthy and False in field.falsy
+        ):
+            env[f"t{index}"] = value_type
+            conversion = "typed"
+    if conversion != "raw":
+        env[f"s{index}"] = field._deserialize
+    validators = tuple(
+        _validator_kind(validator, f"v{index}_{number}", env)
+        for number, validator in enumerate(field.validators)
+    )
+    return (
+        "field",
+        dotted,
+        field.required,
+        field.allow_none,
+        default_kind,
+        conversion,
+        validators,
+    )
+
+
+def _load_source(kinds: typing.Tuple[_Kind, ...]) -> str:
+    lines = ["def make(env):"]
+    lines.extend(f"    {name} = env[{name!r}]" for name in _load_env_names(kinds))
+    lines.append("    def load_one(data, partial, unknown, kwargs):")
+    lines.append("        ret = dict_class()")
+
+    def add(indent: int, line: str) -> None:
+        lines.append("    " * indent + line)
+
+    def add_set(indent: int, i: int, dotted: bool, value: str = "value") -> None:
+        if dotted:
+            add(indent, f"set_value(ret, a{i}, {value})")
+        else:
+            add(indent, f"ret[a{i}] = {value}")
+
+    def add_missing(indent: int, i: int, kind: _Kind) -> None:
+        _, dotted, required, _, default_kind, _, _ = kind
+        if required:
+            add(indent, "raise Failed")
+        elif default_kind == "callable":
+            add(indent, f"value = d{i}()")
+            add(indent, "if value is not missing:")
+            add_set(indent + 1, i, dotted)
+        elif default_kind == "value":
+            add_set(indent, i, dotted, f"d{i}")
+        else:
+            add(indent, "pass")
+
+    def add_validators(indent: int, i: int, validators: typing.Tuple) -> None:
+        for number, validator in enumerate(validators):
+            name = f"v{i}_{number}"
+            if validator[0] == "file_size":
+                _, has_min, min_inclusive, has_max, max_inclusive = validator
+                add(indent, "if not isinstance(value, FileStorage):")
+                add(indent + 1, "raise Failed")
+                add(indent, "size = file_size(value)")
+                if has_min:
+                    op = "<" if min_inclusive else "<="
+                    add(indent, f"if size {op} {name}_min:")
+                    add(indent + 1, "raise Failed")
+                if has_max:
+                    op = ">" if max_inclusive else ">="
+                    add(indent, f"if size {op} {name}_max:")
+                    add(indent + 1, "raise Failed")
+            elif validator[0] == "file_type":
+                add(
+                    indent,
+                    "if not isinstance(value, FileStorage) or not value.filename "
+                    f"or splitext(value.filename)[1].lower() not in {name}:",
+                )
+                add(indent + 1, "raise Failed")
+            else:
+                add(indent, f"if {name}(value) is False:")
+                add(indent + 1, "raise Failed")
+
+    def add_present(indent: int, i: int, kind: _Kind) -> None:
+        _, dotted, _, allow_none, _, conversion, validators = kind
+        add(indent, "if value is None:")
+        if allow_none:
+            add_set(indent + 1, i, dotted)
+        else:
+            add(indent + 1, "raise Failed")
+        add(indent, "else:")
+        indent += 1
+        if conversion == "typed":
+            add(
+                indent,
+                f"if value.__class__ is not t{i}:",
+            )
+            add(indent + 1, f"value = s{i}(value, k{i}, data, **kwargs)")
+        elif conversion == "file":
+            add(indent, "if not isinstance(value, FileStorage):")
+            add(indent + 1, "raise Failed")
+        elif conversion == "deserialize":
+            add(indent, f"value = s{i}(value, k{i}, data, **kwargs)")
+        add_validators(indent, i, validators)
+        if conversion == "deserialize":
+            add(indent, "if value is not missing:")
+            add_set(indent + 1, i, dotted)
+        else:
+            add_set(indent, i, dotted)
+
+    for i, kind in enumerate(kinds):
+        add(2, f"value = data.get(k{i}, missing)")
+        if kind[0] == "deserialize":
+            add(2, "if value is not missing or partial is not True:")
+            add(3, f"value = s{i}(value, k{i}, data, **kwargs)")
+            add(3, "if value is not missing:")
+            add_set(4, i, kind[1])
+            continue
+        add(2, "if value is missing:")
+        add(3, "if partial is not True:")
+        add_missing(4, i, kind)
+        if kind[5] == "file":
+            add(2, "elif isinstance(value, Sequence) and len(value) == 0:")
+            add_missing(3, i, kind)
+        add(2, "else:")
+        add_present(3, i, kind)
+    add(2, 'if unknown != "exclude":')
+    add(3, "extra = set(data) - data_keys")
+    add(3, "if extra:")
+    add(4, 'if unknown == "raise":')
+    add(5, "raise Failed")
+    add(4, 'if unknown == "include":')
+    add(5, "for key in extra:")
+    add(6, "ret[key] = data[key]")
+    add(2, "return ret")
+    lines.append("    return load_one")
+    return "\n".join(lines) + "\n"
+
+
+def _load_env_names(kinds: typing.Tuple[_Kind, ...]) -> typing.List[str]:
+    names = [
+        "dict_class",
+        "missing",
+        "data_keys",
+        "Failed",
+        "FileStorage",
+        "Sequence",
+        "file_size",
+        "set_value",
+        "splitext",
+    ]
+    for i, kind in enumerate(kinds):
+        names += [f"k{i}", f"a{i}"]
+        if kind[0] == "deserialize":
+            names.append(f"s{i}")
+            continue
+        _, _, _, _, default_kind, conversion, validators = kind
+        if default_kind is not None:
+            names.append(f"d{i}")
+        if conversion != "raw":
+            names.append(f"s{i}")
+        if conversion == "typed":
+            names.append(f"t{i}")
+        for number, validator in enumerate(validators):
+            if validator[0] == "file_size":
+                names += [f"v{i}_{number}_min", f"v{i}_{number}_max"]
+            else:
+                names.append(f"v{i}_{number}")
+    return names
+
+
+def compile_load(
+    schema: ma.Schema,
+) -> typing.Callable[..., typing.Dict[str, typing.Any]]:
+    """Return a function that deserializes one mapping with ``schema``.
+
+    The function is called with ``(data, partial, unknown, kwargs)``, where
+    ``partial`` is a `bool` or `None` and ``kwargs`` are the keyword arguments
+    passed to the fields' ``deserialize``. It raises `ValidationError
+    <marshmallow.exceptions.ValidationError>` or `_LoadFailed` if the data is
+    invalid.
+    """
+    env: typing.Dict[str, typing.Any] = {
+        "dict_class": schema.dict_class,
+        "missing": missing,
+        "Failed": _LoadFailed,
+        "FileStorage": FileStorage,
+        "Sequence": Sequence,
+        "file_size": _get_filestorage_size,
+        "set_value": set_value,
+        "splitext": os.path.splitext,
+    }
+    kinds = tuple(
+        _load_field_kind(index, attr_name, field, env)
+        for index, (attr_name, field) in enumerate(schema.load_fields.items())
+    )
+    env["data_keys"] = frozenset(
+        env[f"k{index}"] for index in range(len(schema.load_fields))
+    )
+    factory = _load_factories.get(kinds)
+    if factory is None:
+        namespace: typing.Dict[str, typing.Any] = {}
+        code = compile(_load_source(kinds), "<flask_marshmallow load>", "exec")
+        exec(code, namespace)
+        factory = _load_factories[kinds] = namespace["make"]
+    return factory(env)
@@ -0,0 +1,152 @@
+"""
+flask_marshmallow.encoding
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Pluggable JSON encoders for `Schema.jsonify <flask_marshmallow.Schema.jsonify>`
+and the other methods that return JSON responses.
+
+By default, `Schema.jsonify <flask_marshmallow.Schema.jsonify>` passes the
+serialized data to `flask.jsonify`, which encodes it to text with the app's
+JSON provider. A `JSONBackend` encodes it straight to bytes with a ``dumps``
+function instead, such as the one of `orjson <https://github.com/ijl/orjson>`_,
+and builds the response from the bytes. The backend also encodes the objects
+streamed by `Schema.jsonify_stream <flask_marshmallow.Schema.jsonify_stream>`
+and `Schema.jsonify_lines <flask_marshmallow.Schema.jsonify_lines>`, and the
+rows of ``jsonify_rows`` on the sqla schemas. Set ``MARSHMALLOW_JSON_ENCODER`` in the
+app config, or pass ``json_encoder`` to `Marshmallow.init_app
+<flask_marshmallow.Marshmallow.init_app>`, to enable it. ::
+
+    app.config["MARSHMALLOW_JSON_ENCODER"] = "orjson"
+
+Data that the backend can't encode is encoded by the app's JSON provider.
+"""
+
+import functools
+import importlib
+import json
+import typing
+
+from flask import current_app
+
+if typing.TYPE_CHECKING:
+    from flask import Flask
+    from flask.wrappers import Response
+
+_Dumps = typing.Callable[[typing.Any], typing.Union[bytes, str]]
+
+
+class JSONBackend:
+    """Encodes data to JSON bytes with ``dumps``.
+
+    Data that ``dumps`` can't encode (it raises `TypeError`, `ValueError` or
+    `OverflowError`) is encoded with the app's JSON provider.
+
+    :param dumps: Function that encodes an object to JSON bytes or text.
+    :param str name: Name of the backend, for display.
+    """
+
+    def __init__(self, dumps: _Dumps, name: typing.Optional[str] = None):
+        self._dumps = dumps
+        self.name = name or getattr(dumps, "__module__", None) or repr(dumps)
+
+    def __repr__(self):
+        return f"<JSONBackend {self.name!r}>"
+
+    def dumps(self, data: typing.Any) -> bytes:
+        """Encode ``data`` to JSON bytes."""
+        try:
+            encoded = self._dumps(data)
+        except (TypeError, ValueError, OverflowError):
+            encoded = current_app.json.dumps(data)
+        return encoded.encode() if isinstance(encoded, str) else encoded
+
+    def response(self, data: typing.Any) -> "Response":
+        """Return a JSON response containing ``data``, like `flask.jsonify`."""
+        app = current_app
+        return app.response_class(
+            self.dumps(data) + b"\n",
+            mimetype=getattr(app.json, "mimetype", "application/json"),
+        )
+
+
+def _stdlib_dumps(app: "Flask") -> _Dumps:
+    """Return `json.dumps` configured like ``app``'s JSON provider, without
+    indentation.
+    """
+    provider = app.json
+    return functools.partial(
+        json.dumps,
+        default=getattr(provider, "default", None),
+        ensure_ascii=getattr(provider, "ensure_ascii", True),
+        sort_keys=getattr(provider, "sort_keys", True),
+        separators=(",", ":"),
+    )
+
+
+def _orjson_dumps(app: "Flask") -> _Dumps:
+    """Return `orjson.dumps` configured like ``app``'s JSON provider.
+
+    Dates and dataclasses are encoded by the provider, as with `flask.jsonify`.
+    Non-ASCII characters are output as UTF-8 rather than escaped.
+    """
+    import orjson
+
+    provider = app.json
+    option = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+    if getattr(provider, "sort_keys", True):
+        option |= orjson.OPT_SORT_KEYS
+    return functools.partial(
+        orjson.dumps, default=getattr(provider, "default", None), option=option
+    )
+
+
+_BUILTIN_BACKENDS: typing.Dict[str, typing.Callable[["Flask"], _Dumps]] = {
+    "json": _stdlib_dumps,
+    "orjson": _orjson_dumps,
+}
+
+# Key of the app's JSON backend in ``app.extensions``
+_EXTENSION_KEY = "flask-marshmallow.json_backend"
+
+
+def make_json_backend(app: "Flask", encoder: typing.Any) -> JSONBackend:
+    """Return a `JSONBackend` for ``encoder``, which may be:
+
+    - ``"json"``: the standard library `json` module, configured like the
+      app's JSON provider;
+    - ``"orjson"``: `orjson <https://github.com/ijl/orjson>`_, configured like
+      the app's JSON provider;
+    - the name of any other importable module with a ``dumps`` function;
+    - an object with a ``dumps`` method, or a ``dumps`` function;
+    - a `JSONBackend`.
+    """
+    if isinstance(encoder, JSONBackend):
+        return encoder
+    if isinstance(encoder, str):
+        if encoder in _BUILTIN_BACKENDS:
+            return JSONBackend(_BUILTIN_BACKENDS[encoder](app), encoder)
+        return JSONBackend(importlib.import_module(encoder).dumps, encoder)
+    dumps = getattr(encoder, "dumps", encoder)
+    if not callable(dumps):
+        raise TypeError(f"Invalid JSON encoder: {encoder!r}")
+    return JSONBackend(dumps)
+
+
+def set_json_backend(app: "Flask", encoder: typing.Any) -> typing.Optional[JSONBackend]:
+    """Set the JSON backend of ``app`` (see `make_json_backend`) and return
+    it. Pass `None` to encode with the app's JSON provider again.
+    """
+    if encoder is None:
+        app.extensions.pop(_EXTENSION_KEY, None)
+        return None
+    backend = app.extensions[_EXTENSION_KEY] = make_json_backend(app, encoder)
+    return backend
+
+
+def get_json_backend(app: "Flask") -> typing.Optional[JSONBackend]:
+    """Return the JSON backend of ``app``, or `None` if it isn't set."""
+    return app.extensions.get(_EXTENSION_KEY)
@@ -8,13 +8,16 @@ See the `marshmallow.fields` module for the list of all fields available from th
 marshmallow library.
 """
 
+import operator
 import re
 import typing
 from collections.abc import Sequence
 
-from flask import current_app, url_for
+from flask import current_app, g
 from marshmallow import fields, missing
 
+from .routing import _cv_request, build_url
+
 __all__ = [
     "URLFor",
     "UrlFor",
@@ -37,36 +40,108 @@ def _tpl(val: str) -> typing.Optional[str]:
     return None
 
 
-def _get_value(obj, key, default=missing):
-    """Slightly-modified version of marshmallow.utils.get_value.
-    If a dot-delimited ``key`` is passed and any attribute in the
-    path is `None`, return `None`.
+_CONTEXT_CACHE = "_flask_marshmallow_cache"
+
+
+def _get_context_cache() -> typing.Dict[typing.Hashable, typing.Any]:
+    """Return the dict used to memoize values that don't depend on the
+    serialized object. It is stored on the app context (`flask.g`) and reset
+    when a different request context becomes active.
+    """
+    req_ctx = _cv_request.get(None) if _cv_request is not None else None
+    cache = g.get(_CONTEXT_CACHE)
+    if cache is None or cache[0] is not req_ctx:
+        cache = (req_ctx, {})
+        setattr(g, _CONTEXT_CACHE, cache)
+    return cache[1]
+
+
+def _make_key_getter(key: str) -> typing.Callable[[typing.Any], typing.Any]:
+    """Return a function that gets the item ``key`` of an object, or its
+    attribute ``key`` if it has no such item, or ``missing``.
+    """
+    get_item = operator.itemgetter(key)
+    get_attr = operator.attrgetter(key)
+
+    def getter(obj):
+        if hasattr(obj, "__getitem__"):
+            try:
+                return get_item(obj)
+            except (KeyError, IndexError, TypeError, AttributeError):
+                pass
+        try:
+            return get_attr(obj)
+        except AttributeError:
+            return missing
+
+    return getter
+
+
+def _make_value_getter(key: str) -> typing.Callable[[typing.Any], typing.Any]:
+    """Return a function equivalent to `marshmallow.utils.get_value(obj, key)
+    <marshmallow.utils.get_value>`, which returns ``missing`` when a link of
+    a dotted ``key`` is `None`.
+    """
+    getters = [_make_key_getter(each) for each in key.split(".")]
+    if len(getters) == 1:
+        return getters[0]
+
+    def getter(obj):
+        for get in getters:
+            obj = get(obj)
+        return obj
+
+    return getter
+
+
+def _make_getter(key: str) -> typing.Callable[[typing.Any], typing.Any]:
+    """Return a function equivalent to `marshmallow.utils.get_value(obj, key)
+    <marshmallow.utils.get_value>`, except that it returns `None` when a link
+    of a dotted ``key`` is `None`.
     """
-    if "." in key:
-        return _get_value_for_keys(obj, key.split("."), default)
-    else:
-        return _get_value_for_key(obj, key, default)
+    getters = [_make_key_getter(each) for each in key.split(".")]
+    if len(getters) == 1:
+        return getters[0]
+    *path, last = getters
 
+    def getter(obj):
+        for get in path:
+            obj = get(obj)
+            # XXX This differs from the marshmallow implementation
+            if obj is None:
+                return None
+        return last(obj)
 
-def _get_value_for_keys(obj, keys, default):
-    if len(keys) == 1:
-        return _get_value_for_key(obj, keys[0], default)
-    else:
-        value = _get_value_for_key(obj, keys[0], default)
-        # XXX This differs from the marshmallow implementation
-        if value is None:
-            return None
-        return _get_value_for_keys(value, keys[1:], default)
+    return getter
 
 
-def _get_value_for_key(obj, key, default):
-    if not hasattr(obj, "__getitem__"):
-        return getattr(obj, key, default)
+_URLPlan = typing.Tuple[typing.Tuple[str, typing.Any, bool], ...]
+_Getters = typing.Tuple[
+    typing.Tuple[str, typing.Callable[[typing.Any], typing.Any]], ...
+]
+
 
-    try:
-        return obj[key]
-    except (KeyError, IndexError, TypeError, AttributeError):
-        return getattr(obj, key, default)
+def _compile_url_values(
+    values: typing.Dict[str, typing.Any],
+) -> typing.Tuple[_URLPlan, _Getters, typing.Optional[bool]]:
+    """Parse ``URLFor`` values into a plan of ``(name, value, is_attr)`` entries,
+    the getters for the attributes it references and the ``_external`` flag.
+    For ``< >`` templates, ``value`` is the attribute name.
+    """
+    plan = []
+    getters: typing.Dict[str, typing.Callable[[typing.Any], typing.Any]] = {}
+    external = None
+    for name, attr_tpl in values.items():
+        attr_name = _tpl(str(attr_tpl))
+        if attr_name:
+            plan.append((name, attr_name, True))
+            if attr_name not in getters:
+                getters[attr_name] = _make_getter(attr_name)
+        elif name == "_external":
+            external = attr_tpl
+        else:
+            plan.append((name, attr_tpl, False))
+    return tuple(plan), tuple(getters.items()), external
 
 
 class URLFor(fields.Field):
@@ -83,6 +158,9 @@ class URLFor(fields.Field):
             values=dict(id="<id>", _scheme="https", _external=True),
         )
 
+    URLs that don't reference any attribute of the object are generated once
+    per request (or app context) and reused.
+
     :param str endpoint: Flask endpoint name.
     :param dict values: Same keyword arguments as Flask's url_for, except string
         arguments enclosed in `< >` will be interpreted as attributes to pull
@@ -100,28 +178,55 @@ class URLFor(fields.Field):
     ):
         self.endpoint = endpoint
         self.values = values or {}
+        self._url_plan, self._url_getters, self._url_external = _compile_url_values(
+            self.values
+        )
+        # URLs that don't depend on the object are memoized per request
+        self._url_cache_key: typing.Optional[typing.Hashable] = None
+        if not self._url_getters:
+            cache_key = (URLFor, endpoint, self._url_plan, self._url_external)
+            try:
+                hash(cache_key)
+            except TypeError:
+                pass
+            else:
+                self._url_cache_key = cache_key
         fields.Field.__init__(self, **kwargs)
 
     def _serialize(self, value, key, obj):
         """Output the URL for the endpoint, given the kwargs passed to
         ``__init__``.
         """
+        attr_values = {attr_name: get(obj) for attr_name, get in self._url_getters}
+        return self._url_for_attrs(obj, attr_values)
+
+    def _url_for_attrs(
+        self, obj: typing.Any, attr_values: typing.Dict[str, typing.Any]
+    ):
+        """Output the URL for ``obj``, given the values of the attributes
+        referenced by ``values``, keyed by attribute name.
+        """
+        if self._url_cache_key is not None:
+            cache = _get_context_cache()
+            url = cache.get(self._url_cache_key)
+            if url is None:
+                param_values = {name: value for name, value, _ in self._url_plan}
+                url = cache[self._url_cache_key] = build_url(
+                    self.endpoint, param_values, self._url_external
+                )
+            return url
         param_values = {}
-        for name, attr_tpl in self.values.items():
-            attr_name = _tpl(str(attr_tpl))
-            if attr_name:
-                attribute_value = _get_value(obj, attr_name, default=missing)
-                if attribute_value is None:
+        for name, attr_value, is_attr in self._url_plan:
+            if is_attr:
+                attr_name, attr_value = attr_value, attr_values[attr_value]
+                if attr_value is None:
                     return None
-                if attribute_value is not missing:
-                    param_values[name] = attribute_value
-                else:
+                if attr_value is missing:
                     raise AttributeError(
                         f"{attr_name!r} is not a valid " f"attribute of {obj!r}"
                     )
-            else:
-                param_values[name] = attr_tpl
-        return url_for(self.endpoint, **param_values)
+            param_values[name] = attr_value
+        return build_url(self.endpoint, param_values, self._url_external)
 
 
 UrlFor = URLFor
@@ -146,28 +251,43 @@ class AbsoluteURLFor(URLFor):
 AbsoluteUrlFor = AbsoluteURLFor
 
 
-def _rapply(
-    d: typing.Union[dict, typing.Iterable], func: typing.Callable, *args, **kwargs
-):
-    """Apply a function to all values in a dictionary or
-    list of dictionaries, recursively.
-    """
-    if isinstance(d, (tuple, list)):
-        return [_rapply(each, func, *args, **kwargs) for each in d]
-    if isinstance(d, dict):
-        return {key: _rapply(value, func, *args, **kwargs) for key, value in d.items()}
-    else:
-        return func(d, *args, **kwargs)
-
+def _compile_hyperlinks(schema: typing.Any):
+    """Flatten a `Hyperlinks` schema.
 
-def _url_val(val: typing.Any, key: str, obj: typing.Any, **kwargs):
-    """Function applied by `HyperlinksField` to get the correct value in the
-    schema.
+    Returns the containers to build, in order, as ``(parent index, key,
+    template)`` entries where ``template`` holds the static values; the
+    ``(container index, key, URLFor field, inline)`` slots to fill; and the
+    attribute getters shared by the inlined ``URLFor`` fields.
     """
-    if isinstance(val, URLFor):
-        return val.serialize(key, obj, **kwargs)
-    else:
-        return val
+    containers: typing.List[tuple] = []
+    slots: typing.List[tuple] = []
+    getters: typing.Dict[str, typing.Callable[[typing.Any], typing.Any]] = {}
+
+    def visit(node, parent, key):
+        index = len(containers)
+        if isinstance(node, dict):
+            template, items = dict.fromkeys(node), node.items()
+        else:
+            template, items = [None] * len(node), enumerate(node)
+        containers.append((parent, key, template))
+        for each_key, each in items:
+            if isinstance(each, (tuple, list, dict)):
+                visit(each, index, each_key)
+            elif isinstance(each, URLFor):
+                # Subclasses that customize serialization go through serialize()
+                inline = (
+                    type(each).serialize is URLFor.serialize
+                    and type(each)._serialize is URLFor._serialize
+                )
+                if inline:
+                    getters.update(each._url_getters)
+                slots.append((index, each_key, each, inline))
+            else:
+                template[each_key] = each
+
+    # Wrap the schema so the root is always a container
+    visit([schema], None, None)
+    return tuple(containers), tuple(slots), tuple(getters.items())
 
 
 class Hyperlinks(fields.Field):
@@ -203,10 +323,31 @@ class Hyperlinks(fields.Field):
 
     def __init__(self, schema: typing.Dict[str, typing.Union[URLFor, str]], **kwargs):
         self.schema = schema
+        self._containers, self._slots, self._getters = _compile_hyperlinks(schema)
         fields.Field.__init__(self, **kwargs)
 
     def _serialize(self, value, attr, obj):
-        return _rapply(self.schema, _url_val, key=attr, obj=obj)
+        attr_values = {attr_name: get(obj) for attr_name, get in self._getters}
+        return self._links_for_attrs(attr, obj, attr_values)
+
+    def _links_for_attrs(
+        self, attr: str, obj: typing.Any, attr_values: typing.Dict[str, typing.Any]
+    ):
+        """Output the links for ``obj``, given the values of the attributes
+        referenced by the inlined `URLFor` fields, keyed by attribute name.
+        """
+        built: typing.List[typing.Any] = []
+        for parent, key, template in self._containers:
+            container = template.copy()
+            if parent is not None:
+                built[parent][key] = container
+            built.append(container)
+        for index, key, url_field, inline in self._slots:
+            if inline:
+                built[index][key] = url_field._url_for_attrs(obj, attr_values)
+            else:
+                built[index][key] = url_field.serialize(attr, obj)
+        return built[0][0]
 
 
 class File(fields.Field):
@@ -261,7 +402,9 @@ class Config(fields.Field):
             title = Config("API_TITLE")
 
     This field should only be used in an output schema. A ``ValueError`` will
-    be raised if the config key is not found in the app config.
+    be raised if the config key is not found in the app config. The value is
+    read once per request (or app context) and reused for every serialized
+    object.
 
     :param str key: The key of the configuration value.
     """
@@ -273,6 +416,11 @@ class Config(fields.Field):
         self.key = key
 
     def _serialize(self, value, attr, obj, **kwargs):
+        cache = _get_context_cache()
+        cache_key = (Config, self.key)
+        if cache_key in cache:
+            return cache[cache_key]
         if self.key not in current_app.config:
             raise ValueError(f"The key {self.key!r} is not found in the app config.")
-        return current_app.config[self.key]
+        cache[cache_key] = current_app.config[self.key]
+        return cache[cache_key]
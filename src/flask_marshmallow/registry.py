@@ -0,0 +1,131 @@
+"""
+flask_marshmallow.registry
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Pool of shared schema instances.
+
+Instantiating a schema deep-copies and binds all its declared fields, which
+is expensive for large schemas. `SchemaRegistry` keeps a bounded number of
+instances, keyed by schema class and options, so that views can reuse them
+instead of instantiating a schema per request. It is available as
+`Marshmallow.schemas <flask_marshmallow.Marshmallow>`. ::
+
+    @app.route("/authors/")
+    def authors():
+        schema = ma.get_schema(AuthorSchema, many=True, only=("id", "name"))
+        return schema.jsonify(Author.query.all())
+
+Schemas are shared between threads and requests, so they must not be
+mutated. Options that carry per-request state, such as ``context``, aren't
+accepted.
+"""
+
+import threading
+import typing
+from collections import OrderedDict, namedtuple
+
+if typing.TYPE_CHECKING:
+    import marshmallow as ma
+
+SchemaRegistryInfo = namedtuple(
+    "SchemaRegistryInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+_SchemaT = typing.TypeVar("_SchemaT", bound="ma.Schema")
+
+# Options that are collections of field names, whose order doesn't matter
+_FIELD_SETS = ("exclude", "load_only", "dump_only")
+
+
+def _freeze(value: typing.Any) -> typing.Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(each) for each in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def _options_key(options: typing.Mapping[str, typing.Any]) -> typing.Hashable:
+    """Return a hashable key for schema constructor ``options``."""
+    if "context" in options:
+        raise TypeError("Schemas with a context can't be shared.")
+    key = []
+    for name, value in sorted(options.items()):
+        if name in _FIELD_SETS or (name == "partial" and not isinstance(value, bool)):
+            value = frozenset(value)
+        key.append((name, _freeze(value)))
+    return tuple(key)
+
+
+def _schema_state(schema_class: type) -> typing.Hashable:
+    """Return a value that changes when the declared fields or options of
+    ``schema_class`` are replaced.
+    """
+    declared_fields = schema_class._declared_fields  # type: ignore[attr-defined]
+    return (
+        id(schema_class.opts),  # type: ignore[attr-defined]
+        tuple(declared_fields),
+        tuple(map(id, declared_fields.values())),
+    )
+
+
+class SchemaRegistry:
+    """Thread-safe LRU cache of schema instances.
+
+    An instance is created again if the declared fields or options of its
+    class were replaced since it was cached.
+
+    :param int maxsize: Maximum number of schema instances to keep.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._schemas: OrderedDict[typing.Hashable, typing.Tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, schema_class: typing.Type[_SchemaT], **options) -> _SchemaT:
+        """Return a shared instance of ``schema_class``, created with
+        ``options`` (``only``, ``exclude``, ``many``, ``partial``, ...).
+
+        The order of ``exclude``, ``load_only``, ``dump_only`` and ``partial``
+        doesn't matter. The order of ``only`` determines the order of the
+        fields of ordered schemas, so it is part of the key.
+
+        :raises TypeError: If ``context`` is passed.
+        """
+        key = (schema_class, _options_key(options))
+        state = _schema_state(schema_class)
+        with self._lock:
+            entry = self._schemas.get(key)
+            if entry is not None and entry[0] == state:
+                self._schemas.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Instantiate without holding the lock; if two threads race, the
+        # first instance stored wins
+        schema = schema_class(**options)
+        with self._lock:
+            entry = self._schemas.get(key)
+            if entry is not None and entry[0] == state:
+                return entry[1]
+            self._schemas[key] = (state, schema)
+            self._schemas.move_to_end(key)
+            while len(self._schemas) > self.maxsize:
+                self._schemas.popitem(last=False)
+        return schema
+
+    def clear(self):
+        """Remove all schemas and reset the statistics."""
+        with self._lock:
+            self._schemas.clear()
+            self.hits = self.misses = 0
+
+    def cache_info(self) -> SchemaRegistryInfo:
+        """Return the cache statistics, like `functools.lru_cache`."""
+        with self._lock:
+            return SchemaRegistryInfo(
+                self.hits, self.misses, self.maxsize, len(self._schemas)
+            )
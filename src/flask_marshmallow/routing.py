@@ -0,0 +1,507 @@
+"""
+flask_marshmallow.routing
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+URL building and matching helpers used by the hyperlink fields.
+
+`build_url` produces the same result as `flask.url_for`, but compiles the
+endpoint's `Rule <werkzeug.routing.Rule>` once per app into a string template
+with pre-resolved converters. Rules that cannot be compiled (subdomain or host
+matching, defaults, multiple rules per endpoint, ...) and calls that need
+Flask's full machinery (URL defaults, query strings, ``_scheme``, ...) fall
+back to `flask.url_for`.
+
+Compiling a rule reads the parsed rule that werkzeug keeps in private
+attributes. With a werkzeug version that doesn't have them, no rule is
+compiled and URLs are built by `flask.url_for` and matched by the URL map.
+
+Generated URLs can also be memoized in a bounded, per-app `URLCache`. The cache
+is disabled by default; set ``MARSHMALLOW_URL_CACHE_SIZE`` in the app config
+before calling `Marshmallow.init_app <flask_marshmallow.Marshmallow.init_app>`
+to enable it.
+
+`URLMatcher` does the reverse for `HyperlinkRelated
+<flask_marshmallow.sqla.HyperlinkRelated>`: it compiles a single endpoint's rule
+into one regular expression, so incoming URLs aren't matched against the whole
+URL map, and memoizes the results. Rules that share paths with other rules of
+the URL map aren't compiled, as the URL map may route those paths elsewhere.
+"""
+
+import functools
+import re
+import threading
+import typing
+from collections import OrderedDict, namedtuple
+from urllib.parse import quote
+
+from flask import url_for
+from werkzeug.routing import ValidationError as RoutingValidationError
+
+try:
+    from flask.globals import _cv_app, _cv_request
+except ImportError:  # pragma: no cover
+    _cv_app = _cv_request = None  # type: ignore[assignment]
+
+if typing.TYPE_CHECKING:
+    from flask import Flask
+    from werkzeug.routing import Map, MapAdapter, Rule
+
+# Characters werkzeug leaves unquoted in the static parts of a rule
+_SAFE_CHARS = "!$&'()*+,/:;=@"
+
+
+def _rules(url_map: "Map") -> typing.List["Rule"]:
+    """Return the rules of ``url_map``."""
+    rules = getattr(url_map, "_rules", None)
+    return rules if rules is not None else list(url_map.iter_rules())
+
+
+def _trace(rule: "Rule") -> typing.Optional[typing.List[typing.Tuple[bool, str]]]:
+    """Return the parsed parts of ``rule`` as ``(is_dynamic, data)`` pairs, or
+    `None` if werkzeug doesn't expose them.
+    """
+    if not hasattr(rule, "_converters"):
+        return None
+    return getattr(rule, "_trace", None)
+
+
+def _path_trace(rule: "Rule") -> typing.Optional[typing.List[typing.Tuple[bool, str]]]:
+    """Return the path parts of ``rule`` as ``(is_dynamic, data)`` pairs, or
+    `None` if the rule can't be compiled.
+    """
+    trace = _trace(rule)
+    if trace is None:
+        return None
+    if rule.map.host_matching or rule.subdomain or rule.host:
+        return None
+    if rule.defaults or getattr(rule, "websocket", False):
+        return None
+    # Everything before "|" is the domain part of the rule
+    if not trace or trace[0] != (False, "|"):
+        return None
+    path_trace = trace[1:]
+    if {data for is_dynamic, data in path_trace if is_dynamic} != rule.arguments:
+        return None
+    return path_trace
+
+
+def _segments(rule: "Rule") -> typing.Optional[typing.List[list]]:
+    """Return the ``(is_dynamic, data)`` parts of each ``/``-separated segment
+    of ``rule``'s path, or `None` if the rule has no parsed trace.
+    """
+    trace = _trace(rule)
+    if trace is None or (False, "|") not in trace:
+        return None
+    segments: typing.List[list] = [[]]
+    for is_dynamic, data in trace[trace.index((False, "|")) + 1 :]:
+        if is_dynamic:
+            segments[-1].append((True, data))
+            continue
+        first, *rest = data.split("/")
+        if first:
+            segments[-1].append((False, first))
+        for piece in rest:
+            segments.append([(False, piece)] if piece else [])
+    return segments
+
+
+def _segment_regex(
+    rule: "Rule", segment: typing.List[typing.Tuple[bool, str]]
+) -> typing.Optional["re.Pattern[str]"]:
+    """Return the regular expression for a segment of ``rule``, or `None` if
+    the segment has a converter that can match ``/``, like ``path``.
+    """
+    pattern = []
+    for is_dynamic, data in segment:
+        if is_dynamic:
+            converter = rule._converters[data]
+            if not getattr(converter, "part_isolating", False):
+                return None
+            pattern.append(f"(?:{converter.regex})")
+        else:
+            pattern.append(re.escape(data))
+    return re.compile("".join(pattern))
+
+
+def _may_overlap(rule: "Rule", other: "Rule") -> bool:
+    """Return whether a path could match both ``rule`` and ``other``. Errs on
+    the side of `True`.
+    """
+    segments, other_segments = _segments(rule), _segments(other)
+    if segments is None or other_segments is None:
+        return True
+    for segment, other_segment in zip(segments, other_segments):
+        regex = _segment_regex(rule, segment)
+        other_regex = _segment_regex(other, other_segment)
+        if regex is None or other_regex is None:
+            return True
+        if all(not is_dynamic for is_dynamic, _ in segment):
+            if not other_regex.fullmatch("".join(data for _, data in segment)):
+                return False
+        elif all(not is_dynamic for is_dynamic, _ in other_segment):
+            if not regex.fullmatch("".join(data for _, data in other_segment)):
+                return False
+    return len(segments) == len(other_segments)
+
+
+class URLBuilder:
+    """Pre-compiled URL template for a single `Rule <werkzeug.routing.Rule>`.
+
+    Use `URLBuilder.compile` to create an instance; it returns `None` for rules
+    that can't be compiled.
+    """
+
+    def __init__(
+        self,
+        template: str,
+        converters: typing.Sequence[typing.Tuple[str, typing.Callable]],
+    ):
+        self.template = template
+        self.converters = tuple(converters)
+        self.arguments = frozenset(name for name, _ in self.converters)
+
+    @classmethod
+    def compile(cls, rule: "Rule") -> typing.Optional["URLBuilder"]:
+        path_trace = _path_trace(rule)
+        if path_trace is None:
+            return None
+        template = []
+        converters = []
+        for is_dynamic, data in path_trace:
+            if is_dynamic:
+                template.append("{}")
+                converters.append((data, rule._converters[data].to_url))
+            else:
+                if quote(data, safe=_SAFE_CHARS) != data:
+                    return None
+                template.append(data.replace("{", "{{").replace("}", "}}"))
+        return cls("".join(template), converters)
+
+    def build_path(
+        self, values: typing.Mapping[str, typing.Any]
+    ) -> typing.Optional[str]:
+        """Return the path for ``values``, or `None` if ``values`` don't exactly
+        match the rule's arguments.
+        """
+        if len(values) != len(self.converters):
+            return None
+        args = []
+        for name, to_url in self.converters:
+            value = values.get(name)
+            if value is None:
+                return None
+            args.append(to_url(value))
+        return self.template.format(*args)
+
+
+class URLMatcher:
+    """Matches paths against a single `Rule <werkzeug.routing.Rule>`, compiled
+    into one regular expression. Results are memoized in an LRU cache of
+    `cache_size` paths.
+
+    Use `URLMatcher.compile` to create an instance; it returns `None` for rules
+    that can't be compiled.
+    """
+
+    #: Maximum number of memoized paths per matcher
+    cache_size = 1024
+
+    def __init__(
+        self,
+        regex: "re.Pattern[str]",
+        converters: typing.Sequence[typing.Tuple[str, typing.Callable]],
+    ):
+        self.regex = regex
+        self.converters = tuple(converters)
+        self._cached_match = functools.lru_cache(maxsize=self.cache_size)(self._match)
+
+    @classmethod
+    def compile(cls, rule: "Rule") -> typing.Optional["URLMatcher"]:
+        path_trace = _path_trace(rule)
+        if path_trace is None:
+            return None
+        if rule.redirect_to is not None:
+            return None
+        if rule.methods is not None and "GET" not in rule.methods:
+            return None
+        # The URL map may route paths the rule matches to another rule that
+        # takes precedence, e.g. "/nodes/new" over "/nodes/<id>"
+        for other in _rules(rule.map):
+            if other is rule or (
+                other.methods is not None and "GET" not in other.methods
+            ):
+                continue
+            if _may_overlap(rule, other):
+                return None
+        pattern = []
+        converters = []
+        for is_dynamic, data in path_trace:
+            if is_dynamic:
+                converter = rule._converters[data]
+                pattern.append(f"({converter.regex})")
+                converters.append((data, converter.to_python))
+            else:
+                pattern.append(re.escape(data))
+        return cls(re.compile("".join(pattern)), converters)
+
+    def match(self, path: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Return the rule's arguments parsed from ``path``, or `None` if the
+        path doesn't match the rule. The returned dict must not be modified.
+        """
+        return self._cached_match(path)
+
+    def _match(self, path: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        match = self.regex.fullmatch(path)
+        if match is None:
+            return None
+        try:
+            return {
+                name: to_python(value)
+                for (name, to_python), value in zip(self.converters, match.groups())
+            }
+        except RoutingValidationError:
+            return None
+
+
+class _CompiledMap:
+    """Compiled builders, matchers and bound adapter for an app's URL map."""
+
+    def __init__(self, url_map: "Map"):
+        self.url_map = url_map
+        self.rule_count = len(_rules(url_map))
+        self.builders: typing.Dict[str, typing.Optional[URLBuilder]] = {}
+        self.matchers: typing.Dict[str, typing.Optional[URLMatcher]] = {}
+        self.adapter: typing.Optional[MapAdapter] = None
+
+
+# Key of the app's compiled URL map in ``app.extensions``
+_COMPILED_MAP_KEY = "flask-marshmallow.compiled_url_map"
+
+
+def _get_compiled_map(app: "Flask") -> _CompiledMap:
+    url_map = app.url_map
+    compiled = app.extensions.get(_COMPILED_MAP_KEY)
+    if (
+        compiled is None
+        or compiled.url_map is not url_map
+        or compiled.rule_count != len(_rules(url_map))
+    ):
+        compiled = app.extensions[_COMPILED_MAP_KEY] = _CompiledMap(url_map)
+    return compiled
+
+
+def _get_rule(url_map: "Map", endpoint: str) -> typing.Optional["Rule"]:
+    """Return the rule for ``endpoint`` if it is the only one."""
+    try:
+        rules = list(url_map.iter_rules(endpoint))
+    except KeyError:
+        return None
+    return rules[0] if len(rules) == 1 else None
+
+
+def get_url_builder(app: "Flask", endpoint: str) -> typing.Optional[URLBuilder]:
+    """Return the compiled builder for ``endpoint``, or `None` if the endpoint's
+    rule can't be compiled. Builders are rebuilt when rules are added to
+    ``app.url_map``.
+    """
+    builders = _get_compiled_map(app).builders
+    try:
+        return builders[endpoint]
+    except KeyError:
+        pass
+    rule = _get_rule(app.url_map, endpoint)
+    builder = builders[endpoint] = URLBuilder.compile(rule) if rule else None
+    return builder
+
+
+def get_url_matcher(app: "Flask", endpoint: str) -> typing.Optional[URLMatcher]:
+    """Return the compiled matcher for ``endpoint``, or `None` if the endpoint's
+    rule can't be compiled. Matchers are rebuilt when rules are added to
+    ``app.url_map``.
+    """
+    matchers = _get_compiled_map(app).matchers
+    try:
+        return matchers[endpoint]
+    except KeyError:
+        pass
+    rule = _get_rule(app.url_map, endpoint)
+    matcher = matchers[endpoint] = URLMatcher.compile(rule) if rule else None
+    return matcher
+
+
+def get_url_adapter(app: "Flask") -> "MapAdapter":
+    """Return a `MapAdapter <werkzeug.routing.MapAdapter>` for matching paths
+    against ``app.url_map``, bound once per app.
+    """
+    compiled = _get_compiled_map(app)
+    if compiled.adapter is None:
+        compiled.adapter = compiled.url_map.bind("")
+    return compiled.adapter
+
+
+URLCacheInfo = namedtuple("URLCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class URLCache:
+    """Thread-safe LRU cache of generated URLs for a single app.
+
+    The cache is cleared whenever rules are added to the app's URL map.
+
+    :param int maxsize: Maximum number of URLs to keep.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._urls: OrderedDict[typing.Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._url_map: typing.Optional[Map] = None
+        self._rule_count = 0
+
+    def get(self, url_map: "Map", key: typing.Hashable) -> typing.Optional[str]:
+        """Return the URL stored for ``key``, or `None`."""
+        with self._lock:
+            rule_count = len(_rules(url_map))
+            if url_map is not self._url_map or rule_count != self._rule_count:
+                self._urls.clear()
+                self._url_map = url_map
+                self._rule_count = rule_count
+            url = self._urls.get(key)
+            if url is None:
+                self.misses += 1
+                return None
+            self._urls.move_to_end(key)
+            self.hits += 1
+            return url
+
+    def set(self, key: typing.Hashable, url: str):
+        """Store ``url`` for ``key``, evicting the least recently used URL if
+        the cache is full.
+        """
+        with self._lock:
+            self._urls[key] = url
+            self._urls.move_to_end(key)
+            if len(self._urls) > self.maxsize:
+                self._urls.popitem(last=False)
+
+    def clear(self):
+        """Remove all URLs and reset the statistics."""
+        with self._lock:
+            self._urls.clear()
+            self.hits = self.misses = 0
+
+    def cache_info(self) -> URLCacheInfo:
+        """Return the cache statistics, like `functools.lru_cache`."""
+        with self._lock:
+            return URLCacheInfo(self.hits, self.misses, self.maxsize, len(self._urls))
+
+
+# Key of the app's URL cache in ``app.extensions``
+_EXTENSION_KEY = "flask-marshmallow.url_cache"
+
+
+def enable_url_cache(app: "Flask", maxsize: int) -> URLCache:
+    """Enable the URL cache for ``app`` and return it."""
+    url_cache = app.extensions[_EXTENSION_KEY] = URLCache(maxsize)
+    return url_cache
+
+
+def disable_url_cache(app: "Flask"):
+    """Disable the URL cache for ``app``, if it is enabled."""
+    app.extensions.pop(_EXTENSION_KEY, None)
+
+
+def get_url_cache(app: "Flask") -> typing.Optional[URLCache]:
+    """Return the URL cache of ``app``, or `None` if it isn't enabled."""
+    return app.extensions.get(_EXTENSION_KEY)
+
+
+def build_url(
+    endpoint: str,
+    values: typing.Mapping[str, typing.Any],
+    external: typing.Optional[bool] = None,
+) -> str:
+    """Return the URL for ``endpoint``. Equivalent to
+    ``url_for(endpoint, _external=external, **values)``.
+    """
+    if _cv_request is None or endpoint[:1] == ".":
+        return _url_for(endpoint, values, external)
+    req_ctx = _cv_request.get(None)
+    if req_ctx is not None:
+        app = req_ctx.app
+        adapter = req_ctx.url_adapter
+        # Inside a request, URLs are relative unless asked otherwise
+        force_external = bool(external)
+    else:
+        app_ctx = _cv_app.get(None)
+        if app_ctx is None:
+            return _url_for(endpoint, values, external)
+        app = app_ctx.app
+        adapter = app_ctx.url_adapter
+        force_external = external is None or external
+    # URL defaults may depend on anything, so leave them to url_for
+    if adapter is None or any(app.url_default_functions.values()):
+        return _url_for(endpoint, values, external)
+
+    url_cache = app.extensions.get(_EXTENSION_KEY)
+    if url_cache is None:
+        return _build_url(app, adapter, endpoint, values, external, force_external)
+    key = (
+        endpoint,
+        # True, 1 and 1.0 are equal but may build different URLs
+        tuple((name, type(value), value) for name, value in values.items()),
+        external,
+        force_external,
+        adapter.url_scheme,
+        adapter.server_name,
+        adapter.script_name,
+        adapter.subdomain,
+    )
+    try:
+        url = url_cache.get(adapter.map, key)
+    except TypeError:  # Unhashable values
+        return _build_url(app, adapter, endpoint, values, external, force_external)
+    if url is None:
+        url = _build_url(app, adapter, endpoint, values, external, force_external)
+        url_cache.set(key, url)
+    return url
+
+
+def _build_url(
+    app: "Flask",
+    adapter: "MapAdapter",
+    endpoint: str,
+    values: typing.Mapping[str, typing.Any],
+    external: typing.Optional[bool],
+    force_external: bool,
+) -> str:
+    builder = get_url_builder(app, endpoint)
+    path = builder.build_path(values) if builder is not None else None
+    if path is not None:
+        return _join_url(adapter, path, force_external)
+    return _url_for(endpoint, values, external)
+
+
+def _url_for(
+    endpoint: str,
+    values: typing.Mapping[str, typing.Any],
+    external: typing.Optional[bool],
+) -> str:
+    if external is not None:
+        return url_for(endpoint, _external=external, **values)
+    return url_for(endpoint, **values)
+
+
+def _join_url(adapter, path: str, external: bool) -> str:
+    """Same as the tail of `MapAdapter.build <werkzeug.routing.MapAdapter.build>`
+    for a rule without a domain part.
+    """
+    if not external and not adapter.subdomain:
+        return f"{adapter.script_name.rstrip('/')}/{path.lstrip('/')}"
+    url_scheme = adapter.url_scheme
+    if url_scheme:
+        url_scheme = "https" if url_scheme in {"https", "wss"} else "http"
+    scheme = f"{url_scheme}:" if url_scheme else ""
+    host = adapter.get_host("")
+    return f"{scheme}//{host}{adapter.script_name[:-1]}/{path.lstrip('/')}"
@@ -1,18 +1,454 @@
+import codecs
+import contextlib
+import itertools
+import json
+import re
 import typing
+from collections.abc import Mapping
 
 import flask
 import marshmallow as ma
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
+from marshmallow.error_store import ErrorStore
+
+from .compiler import _LoadFailed, compile_dump, compile_load
+from .encoding import get_json_backend
+from .registry import SchemaRegistry
 
 if typing.TYPE_CHECKING:
+    from flask import Flask
     from flask.wrappers import Response
 
+#: Default number of objects serialized at once by the streaming methods
+STREAM_BATCH_SIZE = 1000
+
+#: Number of bytes read at once from request streams
+STREAM_CHUNK_SIZE = 64 * 1024
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+#: Maximum number of sparse fieldset variants cached per schema instance
+SPARSE_CACHE_SIZE = 32
+
+_skip_whitespace = re.compile(r"[ \t\n\r]*").match
+
+# Literals, and the ends of numbers and string escapes, that a value cut off
+# at the end of the buffer may leave unparsed
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+_incomplete_token = re.compile(
+    r"(?:[.eE][-+]?|u[0-9a-fA-F]{0,4}(?:\\u?[0-9a-fA-F]{0,3})?)\Z"
+).match
+
+
+def _batched(iterable: typing.Iterable, size: int) -> typing.Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _truncated(error: json.JSONDecodeError, buffer: str) -> bool:
+    """Return whether ``error`` may come from a value cut off at the end of
+    ``buffer``, rather than from invalid JSON.
+    """
+    rest = buffer[error.pos :]
+    return (
+        not rest
+        or error.msg.startswith("Unterminated string")
+        or any(literal.startswith(rest) for literal in _LITERALS)
+        or _incomplete_token(rest) is not None
+    )
+
+
+def _iter_json_array(
+    stream: typing.Any, chunk_size: int = STREAM_CHUNK_SIZE
+) -> typing.Iterator[typing.Any]:
+    """Parse the items of the JSON array read from the file-like ``stream``,
+    reading ``chunk_size`` bytes at a time. Only the item being parsed is held
+    in memory.
+
+    While an item is incomplete, the size of the reads doubles, so that large
+    items are parsed in linear time.
+
+    :raises ValueError: If the stream doesn't contain a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+    read_size = chunk_size
+
+    def fill():
+        # Drop what has been parsed and append the next chunk
+        nonlocal buffer, pos, eof
+        chunk = stream.read(read_size)
+        eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk, final=eof)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            pos = _skip_whitespace(buffer, pos).end()  # type: ignore[union-attr]
+            if pos < len(buffer) or eof:
+                return buffer[pos : pos + 1]
+            fill()
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            next_char()
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                if eof or not _truncated(error, buffer):
+                    raise
+                read_size *= 2
+                fill()
+                continue
+            # A number may continue in the next chunk, and its end may not
+            # parse yet (e.g. "2." or "2e+")
+            after = _skip_whitespace(buffer, end).end()  # type: ignore[union-attr]
+            if not eof and (
+                after == len(buffer)
+                or (buffer[after] not in ",]" and len(buffer) - end <= 2)
+            ):
+                read_size *= 2
+                fill()
+                continue
+            read_size = chunk_size
+            yield item
+            pos = end
+            char = next_char()
+            pos += 1
+            if char == "]":
+                break
+            if char != ",":
+                raise ValueError("Expected ',' or ']'.")
+    if next_char():
+        raise ValueError("Extra data after the JSON array.")
+
+
+def _pretty_json(app: "Flask") -> bool:
+    """Return whether `flask.jsonify` indents its output for ``app``."""
+    compact = getattr(app.json, "compact", None)
+    return compact is False or (compact is None and app.debug)
+
+
+def _has_hooks(schema: ma.Schema, tag: str) -> bool:
+    """Return whether ``schema`` has processors for the hook ``tag``.
+
+    Older marshmallow versions key processors by ``(tag, pass_many)``. The
+    hooks are read with ``get``, as looking up a missing key of the
+    defaultdict adds it.
+    """
+    hooks: typing.Mapping[typing.Any, typing.Any] = schema._hooks
+    return bool(hooks.get(tag) or hooks.get((tag, True)) or hooks.get((tag, False)))
+
+
+def _fusable_provider(app: "Flask") -> typing.Optional[DefaultJSONProvider]:
+    """Return ``app``'s JSON provider if `flask.jsonify` encodes with
+    `json.dumps` and the provider's settings, without indentation.
+    """
+    provider = app.json
+    if (
+        isinstance(provider, DefaultJSONProvider)
+        and type(provider).dumps is DefaultJSONProvider.dumps
+        and type(provider).response is DefaultJSONProvider.response
+        and not _pretty_json(app)
+    ):
+        return provider
+    return None
+
+
+class _FusedJSONPlan:
+    """Encodes the fields of a schema to JSON text as they are serialized, in
+    the same format as `flask.jsonify`.
+    """
+
+    def __init__(self, schema: ma.Schema, provider: DefaultJSONProvider):
+        encoder = json.JSONEncoder(
+            default=provider.default,
+            ensure_ascii=provider.ensure_ascii,
+            sort_keys=provider.sort_keys,
+            separators=(",", ":"),
+        )
+        self.encode = encoder.encode
+        c_make_encoder = getattr(json.encoder, "c_make_encoder", None)
+        if c_make_encoder is not None:
+            # Reuse one C encoder, as JSONEncoder.encode creates one per call.
+            # Without markers, circular references raise RecursionError
+            c_encoder = c_make_encoder(
+                None,
+                encoder.default,
+                json.encoder.encode_basestring_ascii  # type: ignore[attr-defined]
+                if provider.ensure_ascii
+                else json.encoder.encode_basestring,  # type: ignore[attr-defined]
+                None,
+                encoder.key_separator,
+                encoder.item_separator,
+                encoder.sort_keys,
+                encoder.skipkeys,
+                encoder.allow_nan,
+            )
+
+            def encode(value):
+                return "".join(c_encoder(value, 0))
+
+            self.encode = encode
+        entries = []
+        data_keys = []
+        for attr_name, field in schema.dump_fields.items():
+            data_key = field.data_key if field.data_key is not None else attr_name
+            data_keys.append(data_key)
+            entries.append((encoder.encode(data_key) + ":", attr_name, field.serialize))
+        self.fields = tuple(entries)
+        # Fields are serialized in order, then output in key order if sorted.
+        # `json.dumps` sorts the keys themselves, not their encoded form
+        order = sorted(range(len(entries)), key=data_keys.__getitem__)
+        self.order: typing.Optional[typing.Tuple[int, ...]] = None
+        if provider.sort_keys and order != sorted(order):
+            self.order = tuple(order)
+
+        encode = self.encode
+
+        def encode_float(value):
+            # Infinity and NaN aren't finite
+            return float.__repr__(value) if value - value == 0 else encode(value)
+
+        self.scalar_encoders: typing.Dict[type, typing.Callable[[typing.Any], str]] = {
+            str: (
+                json.encoder.encode_basestring_ascii  # type: ignore[attr-defined]
+                if provider.ensure_ascii
+                else json.encoder.encode_basestring  # type: ignore[attr-defined]
+            ),
+            int: int.__repr__,
+            float: encode_float,
+            bool: {True: "true", False: "false"}.__getitem__,
+            type(None): lambda value: "null",
+        }
+
+    def writer(
+        self, accessor: typing.Callable, out: typing.List[str]
+    ) -> typing.Callable[[typing.Any], None]:
+        """Return a function that appends the JSON object for an object to
+        ``out``.
+        """
+        fields, order, encode = self.fields, self.order, self.encode
+        get_encoder = self.scalar_encoders.get
+        append = out.append
+
+        def write(obj):
+            members = []
+            for key, attr_name, serialize in fields:
+                value = serialize(attr_name, obj, accessor=accessor)
+                if value is missing:
+                    member = None
+                else:
+                    encode_value = get_encoder(type(value))
+                    member = key + (
+                        encode_value(value)
+                        if encode_value is not None
+                        else encode(value)
+                    )
+                members.append(member)
+            if order is not None:
+                members = [members[i] for i in order]
+            append("{" + ",".join([m for m in members if m is not None]) + "}")
+
+        return write
+
+
+def _split_names(values: typing.Iterable[str]) -> typing.List[str]:
+    """Split comma-separated lists of field names."""
+    return [name for value in values for name in value.split(",") if name]
+
+
+def _nested_schema(field: ma.fields.Field) -> typing.Optional[ma.Schema]:
+    if isinstance(field, ma.fields.List):
+        field = field.inner
+    if isinstance(field, ma.fields.Nested):
+        return field.schema
+    return None
+
+
+def _resolve_name(schema: ma.Schema, name: str) -> typing.Optional[str]:
+    """Return the (dotted) attribute name of the field of ``schema`` output
+    under the (dotted) key ``name``, or `None` if there is no such field.
+    """
+    key, dot, rest = name.partition(".")
+    for attr_name, field in schema.dump_fields.items():
+        if (field.data_key if field.data_key is not None else attr_name) == key:
+            break
+    else:
+        return None
+    if not dot:
+        return attr_name
+    nested = _nested_schema(field)
+    resolved = None if nested is None else _resolve_name(nested, rest)
+    return None if resolved is None else f"{attr_name}.{resolved}"
+
+
+def _json_dumps(app: "Flask") -> typing.Callable[[typing.Any], bytes]:
+    """Return a function that encodes data to JSON bytes with ``app``'s JSON
+    backend, or with its JSON provider if it has none.
+    """
+    backend = get_json_backend(app)
+    if backend is not None:
+        return backend.dumps
+    dumps = app.json.dumps
+    return lambda data: dumps(data).encode()
+
+
+def _stream_response(chunks: typing.Iterator[bytes], mimetype: str) -> "Response":
+    """Return a response that streams ``chunks`` within the current request
+    context.
+    """
+    if flask.has_request_context():
+        chunks = flask.stream_with_context(chunks)
+    return flask.current_app.response_class(chunks, mimetype=mimetype)
+
+
+class _FirstError(Exception):
+    def __init__(self, errors: dict):
+        self.errors = errors
+
+
+class _FailFastErrorStore(ErrorStore):
+    """Error store that stops the load at the first error."""
+
+    def store_error(self, *args, **kwargs):
+        super().store_error(*args, **kwargs)
+        raise _FirstError(self.errors)
+
 
 class Schema(ma.Schema):
     """Base serializer with which to define custom serializers.
 
     See `marshmallow.Schema` for more details about the `Schema` API.
+
+    :param bool fail_fast: Whether `load` and `validate` stop at the first
+        error, instead of validating all the fields and reporting all the
+        errors. The `ValidationError <marshmallow.exceptions.ValidationError>`
+        then only contains the first error, and its ``valid_data`` is `None`.
+
+    .. versionchanged:: 1.3.0
+        Add the ``fail_fast`` parameter.
     """
 
+    _compiled_dump: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None
+    _compiled_load: typing.Optional[typing.Callable[..., typing.Any]] = None
+
+    #: Query parameters read by `sparse`
+    sparse_fields_param = "fields"
+    sparse_exclude_param = "exclude"
+
+    def __init__(self, *args, fail_fast: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_fast = fail_fast
+        self._init_options = {**kwargs, "fail_fast": fail_fast}
+
+    def sparse(
+        self,
+        fields: typing.Optional[typing.Iterable[str]] = None,
+        exclude: typing.Optional[typing.Iterable[str]] = None,
+    ) -> "Schema":
+        """Return a variant of this schema that only serializes ``fields``,
+        and/or doesn't serialize ``exclude``. ::
+
+            # GET /authors/?fields=id,name,books.title
+            return authors_schema.sparse().jsonify(authors)
+
+        Names are output keys (``data_key``), and may be dotted to select the
+        fields of nested schemas. If neither ``fields`` nor ``exclude`` is
+        passed, they are read from the ``fields`` and ``exclude`` query
+        parameters (`sparse_fields_param` and `sparse_exclude_param`) as
+        comma-separated lists. Returns this schema if no fields are selected.
+
+        Variants are cached per normalized field set, in an LRU cache of
+        `SPARSE_CACHE_SIZE` variants per schema instance, and compiled if this
+        schema is (see `compile_dump` and `compile_load`). They don't receive
+        the ``context`` of this schema.
+
+        :raises marshmallow.exceptions.ValidationError: If a name doesn't
+            match a serialized field. The errors are keyed by parameter and
+            name.
+
+        .. versionadded:: 1.3.0
+        """
+        if fields is None and exclude is None and flask.has_request_context():
+            args = flask.request.args
+            fields = _split_names(args.getlist(self.sparse_fields_param)) or None
+            exclude = _split_names(args.getlist(self.sparse_exclude_param)) or None
+        if fields is None and not exclude:
+            return self
+        errors: typing.Dict[str, typing.Dict[str, typing.List[str]]] = {}
+        resolved: typing.Dict[str, typing.Set[str]] = {}
+        for param, names in (
+            (self.sparse_fields_param, fields),
+            (self.sparse_exclude_param, exclude),
+        ):
+            if names is None:
+                continue
+            resolved[param] = attr_names = set()
+            for name in names:
+                attr_name = _resolve_name(self, name)
+                if attr_name is None:
+                    errors.setdefault(param, {})[name] = ["Unknown field."]
+                else:
+                    attr_names.add(attr_name)
+        if errors:
+            raise ma.ValidationError(errors)
+        options = self._variant_options()
+        only = resolved.get(self.sparse_fields_param)
+        if only is not None:
+            if self.only is not None:
+                # Keep the restrictions of this schema on the selected fields
+                heads = {name.partition(".")[0] for name in only}
+                only.update(
+                    name
+                    for name in self.only
+                    if "." in name and name.partition(".")[0] in heads
+                )
+            # In the order of the fields, for ordered schemas
+            positions = {name: index for index, name in enumerate(self.fields)}
+            options["only"] = tuple(
+                sorted(only, key=lambda name: (positions[name.partition(".")[0]], name))
+            )
+        options["exclude"] = tuple(
+            sorted(set(self.exclude) | resolved.get(self.sparse_exclude_param, set()))
+        )
+        variants = self.__dict__.get("_sparse_variants")
+        if variants is None:
+            variants = self.__dict__.setdefault(
+                "_sparse_variants", SchemaRegistry(SPARSE_CACHE_SIZE)
+            )
+        variant = variants.get(type(self), **options)
+        if self._compiled_dump is not None and variant._compiled_dump is None:
+            variant.compile_dump()
+        if self._compiled_load is not None and variant._compiled_load is None:
+            variant.compile_load()
+        return variant
+
+    def _variant_options(self) -> typing.Dict[str, typing.Any]:
+        """Return the options with which to create variants of this schema."""
+        options = dict(self._init_options)
+        options.pop("context", None)
+        options.pop("only", None)
+        options.pop("exclude", None)
+        return options
+
     def jsonify(
         self, obj: typing.Any, many: typing.Optional[bool] = None, *args, **kwargs
     ) -> "Response":
@@ -34,8 +470,383 @@ class Schema(ma.Schema):
             the `many` attribute on the Schema. Previously, the `many`
             argument of this method defaulted to False, regardless of the
             value of `Schema.many`.
+
+        .. versionchanged:: 1.3.0
+            Encodes the data with the app's JSON backend if one is set (see
+            `flask_marshmallow.encoding`) and no additional arguments are
+            passed.
         """
         if many is None:
             many = self.many
+        app = flask.current_app._get_current_object()  # type: ignore[attr-defined]
+        backend = get_json_backend(app)
+        if backend is None and not args and not kwargs:
+            provider = _fusable_provider(app)
+            if provider is not None and self._can_fuse_json():
+                return app.response_class(
+                    self._fused_json(obj, many, provider), mimetype=provider.mimetype
+                )
         data = self.dump(obj, many=many)
-        return flask.jsonify(data, *args, **kwargs)
+        if backend is None or args or kwargs or _pretty_json(app):
+            return flask.jsonify(data, *args, **kwargs)
+        return backend.response(data)
+
+    def _can_fuse_json(self) -> bool:
+        """Return whether `jsonify` can encode the fields as they are
+        serialized, instead of encoding the result of `dump`.
+        """
+        return (
+            not _has_hooks(self, POST_DUMP)
+            and type(self).dump is ma.Schema.dump
+            and type(self)._serialize is Schema._serialize
+            and type(self).get_attribute is ma.Schema.get_attribute
+        )
+
+    def _fused_json(
+        self, obj: typing.Any, many: bool, provider: DefaultJSONProvider
+    ) -> bytes:
+        """Serialize ``obj`` straight to the JSON body `flask.jsonify` would
+        return for ``self.dump(obj, many=many)``, without building the
+        serialized dicts.
+        """
+        if _has_hooks(self, PRE_DUMP):
+            obj = self._invoke_dump_processors(
+                PRE_DUMP, obj, many=many, original_data=obj
+            )
+        plan = self._fused_json_plan(provider)
+        out: typing.List[str] = []
+        if obj is None:
+            # marshmallow serializes None as an object, even if ``many``
+            plan.writer(self.get_attribute, out)(obj)
+        else:
+            with self._dump_context(obj, many) as obj:
+                write = plan.writer(self.get_attribute, out)
+                if many:
+                    out.append("[")
+                    for index, each in enumerate(obj):
+                        if index:
+                            out.append(",")
+                        write(each)
+                    out.append("]")
+                else:
+                    write(obj)
+        out.append("\n")
+        return "".join(out).encode()
+
+    def _precompute(self, provider: typing.Optional[DefaultJSONProvider]) -> None:
+        """Compute the state that dumps compute on first use, e.g. before
+        forking worker processes. ``provider`` is the app's JSON provider, if
+        `jsonify` can encode fields as they are serialized with it.
+        """
+        if provider is not None and self._can_fuse_json():
+            self._fused_json_plan(provider)
+
+    def _fused_json_plan(self, provider: DefaultJSONProvider) -> _FusedJSONPlan:
+        plans = self.__dict__.setdefault("_fused_json_plans", {})
+        plan_key = (provider.sort_keys, provider.ensure_ascii, provider.default)
+        plan = plans.get(plan_key)
+        if plan is None:
+            plan = plans[plan_key] = _FusedJSONPlan(self, provider)
+        return plan
+
+    def compile_dump(self) -> bool:
+        """Generate a dump function specialized for the fields of this schema
+        instance (see `flask_marshmallow.compiler`) and serialize objects with
+        it. The output of `dump` is unchanged.
+
+        Returns `False`, and keeps serializing objects with
+        `marshmallow.Schema`, if the schema class overrides ``_serialize``.
+        Nested schemas are compiled separately.
+
+        .. versionadded:: 1.3.0
+        """
+        if type(self)._serialize is not Schema._serialize:
+            self._compiled_dump = None
+            return False
+        self._compiled_dump = compile_dump(self)
+        return True
+
+    def _serialize(self, obj: typing.Any, *, many: bool = False):
+        if obj is None:
+            return super()._serialize(obj, many=many)
+        serialize = self._compiled_dump or super()._serialize
+        if type(self)._dump_context is Schema._dump_context:
+            return [serialize(each) for each in obj] if many else serialize(obj)
+        with self._dump_context(obj, many) as obj:
+            return [serialize(each) for each in obj] if many else serialize(obj)
+
+    @contextlib.contextmanager
+    def _dump_context(self, obj: typing.Any, many: bool) -> typing.Iterator:
+        """Context in which ``obj`` is serialized. Yields the object, or the
+        iterable of objects if ``many``, to serialize.
+
+        Override to prepare the objects before their fields are serialized.
+        """
+        yield obj
+
+    def compile_load(self) -> bool:
+        """Generate a load function specialized for the fields of this schema
+        instance (see `flask_marshmallow.compiler`) and deserialize valid data
+        with it. The results and errors of `load` are unchanged: invalid data
+        is deserialized again by `marshmallow.Schema` to collect the errors.
+
+        Returns `False`, and keeps deserializing data with `marshmallow.Schema`,
+        if the schema class overrides ``_deserialize``. Loads with a collection
+        of ``partial`` field names aren't compiled either. Nested schemas are
+        compiled separately.
+
+        .. versionadded:: 1.3.0
+        """
+        if type(self)._deserialize is not Schema._deserialize:
+            self._compiled_load = None
+            return False
+        self._compiled_load = compile_load(self)
+        return True
+
+    def _do_load(self, data, *, many=None, partial=None, **kwargs):
+        if not self.fail_fast:
+            return super()._do_load(data, many=many, partial=partial, **kwargs)
+        try:
+            return super()._do_load(data, many=many, partial=partial, **kwargs)
+        except _FirstError as error:
+            exc = ma.ValidationError(error.errors, data=data)
+        self.handle_error(
+            exc,
+            data,
+            many=self.many if many is None else bool(many),
+            partial=self.partial if partial is None else partial,
+        )
+        raise exc
+
+    def _fail_fast_store(self, error_store: ErrorStore) -> ErrorStore:
+        if self.fail_fast and not isinstance(error_store, _FailFastErrorStore):
+            return _FailFastErrorStore()
+        return error_store
+
+    def _invoke_field_validators(self, *, error_store, **kwargs):
+        return super()._invoke_field_validators(
+            error_store=self._fail_fast_store(error_store), **kwargs
+        )
+
+    def _invoke_schema_validators(self, *, error_store, **kwargs):
+        return super()._invoke_schema_validators(
+            error_store=self._fail_fast_store(error_store), **kwargs
+        )
+
+    def _deserialize(self, data, *, error_store, many=False, partial=None, **kwargs):
+        error_store = self._fail_fast_store(error_store)
+        load_one = self._compiled_load
+        if (
+            load_one is not None
+            and not many
+            and isinstance(data, Mapping)
+            and (partial is None or partial is True or partial is False)
+        ):
+            try:
+                return load_one(
+                    data,
+                    partial,
+                    kwargs.get("unknown", ma.RAISE),
+                    {} if partial is None else {"partial": partial},
+                )
+            except (ma.ValidationError, _LoadFailed):
+                pass
+        return super()._deserialize(
+            data, error_store=error_store, many=many, partial=partial, **kwargs
+        )
+
+    def jsonify_stream(
+        self, obj: typing.Iterable, batch_size: int = STREAM_BATCH_SIZE
+    ) -> "Response":
+        """Return a streamed JSON response containing the serialized
+        collection ``obj``, as a JSON array.
+
+        The objects are serialized and encoded in batches of ``batch_size``
+        as the response is sent, so the whole collection is never held in
+        memory. ``pre_dump`` and ``post_dump`` hooks receive one batch at a
+        time, and ``post_dump(pass_many=True)`` hooks must return a list.
+        The objects are encoded with the app's JSON backend if one is set (see
+        `flask_marshmallow.encoding`).
+
+        :param obj: Iterable of objects to serialize.
+        :param int batch_size: Number of objects serialized at once.
+        """
+        return _stream_response(
+            self._json_array_chunks(obj, batch_size),
+            getattr(flask.current_app.json, "mimetype", "application/json"),
+        )
+
+    def jsonify_lines(
+        self, obj: typing.Iterable, batch_size: int = STREAM_BATCH_SIZE
+    ) -> "Response":
+        """Return a streamed newline-delimited JSON (NDJSON) response with one
+        serialized object of the collection ``obj`` per line.
+
+        Takes the same arguments as `jsonify_stream`.
+        """
+        return _stream_response(
+            self._json_lines_chunks(obj, batch_size), NDJSON_MIMETYPE
+        )
+
+    def load_lines(
+        self,
+        stream: typing.Optional[typing.Iterable[typing.Union[bytes, str]]] = None,
+        *,
+        partial: typing.Optional[
+            typing.Union[bool, typing.Sequence[str], typing.AbstractSet[str]]
+        ] = None,
+        unknown: typing.Optional[str] = None,
+    ) -> typing.Iterator[typing.Any]:
+        """Deserialize newline-delimited JSON (NDJSON) as it is read, one
+        object per line.
+
+        Yields the deserialized data of each line, in order. For lines that
+        aren't valid JSON or fail validation, yields a
+        `ValidationError <marshmallow.exceptions.ValidationError>` instead,
+        with the messages keyed by line index as for ``many=True`` loads.
+        Blank lines are skipped. ::
+
+            for item in schema.load_lines():
+                if isinstance(item, ValidationError):
+                    errors.update(item.messages)
+                else:
+                    db.session.add(item)
+
+        :param stream: Iterable of lines. Defaults to the body of the current
+            request, `flask.Request.stream`.
+        :param partial: Passed to `load <marshmallow.Schema.load>`.
+        :param unknown: Passed to `load <marshmallow.Schema.load>`.
+        """
+        if stream is None:
+            stream = flask.request.stream
+        loads = flask.current_app.json.loads
+        for index, line in enumerate(stream):
+            if not line.strip():
+                continue
+            try:
+                data = loads(line)
+            except ValueError:
+                yield ma.ValidationError({index: ["Invalid JSON."]})
+                continue
+            try:
+                yield self.load(data, many=False, partial=partial, unknown=unknown)
+            except ma.ValidationError as error:
+                yield ma.ValidationError(
+                    {index: error.messages}, data=data, valid_data=error.valid_data
+                )
+
+    def load_stream(
+        self,
+        stream: typing.Any = None,
+        *,
+        batch_size: int = STREAM_BATCH_SIZE,
+        partial: typing.Optional[
+            typing.Union[bool, typing.Sequence[str], typing.AbstractSet[str]]
+        ] = None,
+        unknown: typing.Optional[str] = None,
+    ) -> typing.Iterator[list]:
+        """Deserialize a JSON array as it is read, in batches.
+
+        The items of the array are parsed incrementally and loaded
+        ``batch_size`` at a time with ``many=True``, so the whole payload is
+        never held in memory. Yields a list with the deserialized data of the
+        valid items of each batch. Once the array has been read, raises a
+        `ValidationError <marshmallow.exceptions.ValidationError>` with the
+        messages of the invalid items, keyed by their index in the array. ::
+
+            try:
+                for items in schema.load_stream():
+                    db.session.add_all(items)
+            except ValidationError as error:
+                db.session.rollback()
+                return error.messages, 422
+            db.session.commit()
+
+        :param stream: File-like object to read the array from. Defaults to
+            the body of the current request, `flask.Request.stream`.
+        :param int batch_size: Number of items loaded at once.
+        :param partial: Passed to `load <marshmallow.Schema.load>`.
+        :param unknown: Passed to `load <marshmallow.Schema.load>`.
+        """
+        if stream is None:
+            stream = flask.request.stream
+        errors: typing.Dict[typing.Union[int, str], typing.Any] = {}
+        items = _iter_json_array(stream)
+        start = 0
+        while True:
+            try:
+                batch = list(itertools.islice(items, batch_size))
+            except ValueError:
+                errors.setdefault(ma.exceptions.SCHEMA, []).append("Invalid JSON.")
+                break
+            if not batch:
+                break
+            indices = list(range(start, start + len(batch)))
+            start += len(batch)
+            loaded = self._load_batch(batch, indices, errors, partial, unknown)
+            if loaded:
+                yield loaded
+        if errors:
+            raise ma.ValidationError(errors)
+
+    def _load_batch(
+        self,
+        batch: list,
+        indices: typing.List[int],
+        errors: typing.Dict[typing.Union[int, str], typing.Any],
+        partial: typing.Any,
+        unknown: typing.Optional[str],
+    ) -> list:
+        """Load ``batch`` with ``many=True``, recording the messages of the
+        invalid items in ``errors`` by their index in ``indices``, and return
+        the deserialized valid items.
+        """
+        while batch:
+            try:
+                return self.load(batch, many=True, partial=partial, unknown=unknown)
+            except ma.ValidationError as error:
+                messages = error.normalized_messages()
+                invalid = set()
+                for key, value in messages.items():
+                    if isinstance(key, int):
+                        invalid.add(key)
+                        errors[indices[key]] = value
+                    elif isinstance(value, list):
+                        errors.setdefault(key, []).extend(value)
+                    else:
+                        errors[key] = value
+                if not invalid:
+                    # Schema-level errors reject the whole batch
+                    return []
+                # Load the valid items again, without the invalid ones
+                valid = [i for i in range(len(batch)) if i not in invalid]
+                batch = [batch[i] for i in valid]
+                indices = [indices[i] for i in valid]
+        return []
+
+    def _json_array_chunks(
+        self, obj: typing.Iterable, batch_size: int
+    ) -> typing.Iterator[bytes]:
+        dumps = _json_dumps(flask.current_app)
+        yield b"["
+        separator = b""
+        for data in self._dump_batches(obj, batch_size):
+            if data:
+                yield separator + b",".join(dumps(item) for item in data)
+                separator = b","
+        yield b"]\n"
+
+    def _json_lines_chunks(
+        self, obj: typing.Iterable, batch_size: int
+    ) -> typing.Iterator[bytes]:
+        dumps = _json_dumps(flask.current_app)
+        for data in self._dump_batches(obj, batch_size):
+            if data:
+                yield b"".join(dumps(item) + b"\n" for item in data)
+
+    def _dump_batches(
+        self, obj: typing.Iterable, batch_size: int
+    ) -> typing.Iterator[list]:
+        """Serialize ``obj`` in batches of ``batch_size`` objects."""
+        for batch in _batched(obj, batch_size):
+            yield self.dump(batch, many=True)
@@ -8,13 +8,38 @@ Integration with Flask-SQLAlchemy and marshmallow-sqlalchemy. Provides
 that use the scoped session from Flask-SQLAlchemy.
 """
 
+import contextlib
+import contextvars
+import functools
+import operator
+import typing
+from collections import defaultdict
+from collections.abc import Hashable, Mapping
 from urllib import parse
 
+import marshmallow as ma
 import marshmallow_sqlalchemy as msqla
-from flask import current_app, url_for
+import sqlalchemy as sa
+from flask import current_app, jsonify
+from marshmallow import fields, missing
+from marshmallow.decorators import POST_DUMP, PRE_DUMP
 from marshmallow.exceptions import ValidationError
+from sqlalchemy.orm import (
+    ColumnProperty,
+    Mapper,
+    RelationshipProperty,
+    joinedload,
+    load_only,
+    selectinload,
+)
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.orm.interfaces import MANYTOONE
+from werkzeug.exceptions import HTTPException
 
-from .schema import Schema
+from .encoding import get_json_backend
+from .fields import Config, Hyperlinks, URLFor
+from .routing import build_url, get_url_adapter, get_url_matcher
+from .schema import STREAM_BATCH_SIZE, Schema, _has_hooks, _pretty_json
 
 
 class DummySession:
@@ -29,7 +54,582 @@ class FlaskSQLAlchemyOptsMixin:
     def __init__(self, meta, **kwargs):
         if not hasattr(meta, "sqla_session"):
             meta.sqla_session = self.session
+        self.batch_related = getattr(meta, "batch_related", False)
+        self.hyperlink_related = getattr(meta, "hyperlink_related", {})
         super().__init__(meta, **kwargs)
+        if self.hyperlink_related:
+            if self.model_converter is msqla.ModelConverter:
+                self.model_converter = HyperlinkModelConverter
+            elif not issubclass(self.model_converter, HyperlinkModelConverter):
+                raise ValueError(
+                    "The `hyperlink_related` option requires `model_converter` "
+                    "to be a subclass of `HyperlinkModelConverter`."
+                )
+
+
+#: Maximum number of keys in a single ``IN`` query when batching related lookups
+BATCH_RELATED_SIZE = 500
+
+# Related keys prefetched for `HyperlinkRelatedList` fields during a
+# ``many=True`` dump, keyed by field, then by parent primary key
+_prefetched_related_keys: contextvars.ContextVar[
+    typing.Optional[typing.Dict[typing.Any, typing.Dict[typing.Any, list]]]
+] = contextvars.ContextVar("flask_marshmallow_prefetched_related_keys", default=None)
+
+# Set while a schema with ``batch_related`` loads, so that nested schemas
+# don't prefetch again
+_batching_related: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "flask_marshmallow_batching_related", default=False
+)
+
+
+def _related_lookup(field: msqla.fields.Related, value: typing.Any):
+    """Return the ``(related model, key attribute name)`` and primary key value
+    that ``field`` would look up for ``value``, or `None` if the lookup can't be
+    batched.
+    """
+    if field.columns or field.transient:
+        return None
+    related_keys = field.related_keys
+    if len(related_keys) != 1:
+        return None
+    key_name = related_keys[0].key
+    if isinstance(field, HyperlinkRelated):
+        try:
+            value = field._get_url_key(value)
+        except (ValidationError, HTTPException, TypeError, ValueError):
+            return None
+    elif isinstance(value, Mapping):
+        value = value.get(key_name)
+    if value is None or not isinstance(value, Hashable):
+        return None
+    return (field.related_model, key_name), value
+
+
+def _collect_field_keys(field: fields.Field, value: typing.Any, collected: dict):
+    if isinstance(field, fields.List):
+        if isinstance(value, (list, tuple)):
+            for each in value:
+                _collect_field_keys(field.inner, each, collected)
+    elif isinstance(field, fields.Nested):
+        schema = field.schema
+        if isinstance(schema, FlaskSQLAlchemySchemaMixin) and value is not None:
+            _collect_related_keys(schema, value, field.many, collected)
+    elif isinstance(field, msqla.fields.Related):
+        lookup = _related_lookup(field, value)
+        if lookup is not None:
+            model_key, key = lookup
+            collected.setdefault(model_key, set()).add(key)
+
+
+def _collect_related_keys(schema, data: typing.Any, many: bool, collected: dict):
+    """Collect the primary keys of the related objects referenced by ``data``,
+    grouped by ``(related model, key attribute name)``.
+    """
+    items = data if many and isinstance(data, (list, tuple)) else [data]
+    load_fields = schema.load_fields
+    for item in items:
+        if not isinstance(item, Mapping):
+            continue
+        for field_name, field in load_fields.items():
+            data_key = field.data_key if field.data_key is not None else field_name
+            if data_key in item:
+                _collect_field_keys(field, item[data_key], collected)
+
+
+def _url_attr_names(field: typing.Any) -> typing.Optional[typing.List[str]]:
+    """Return the attributes read by a `URLFor` or `Hyperlinks` field, or `None`
+    if they can't be known in advance.
+    """
+    if isinstance(field, URLFor):
+        return [attr_name for attr_name, _ in field._url_getters]
+    names: typing.List[str] = []
+    for _, _, url_field, inline in field._slots:
+        if not inline:
+            return None
+        names.extend(attr_name for attr_name, _ in url_field._url_getters)
+    return names
+
+
+class _LoadingPlan(typing.NamedTuple):
+    """What dumping instances of a mapped class with a schema reads."""
+
+    cls: type
+    #: Keys of the column attributes read by the fields, plus the primary key
+    columns: typing.FrozenSet[str]
+    #: Whether the fields read no other columns than ``columns``
+    restrict_columns: bool
+    #: Loader options for the relationships read by the fields
+    relationship_options: tuple
+
+    def column_options(self) -> list:
+        if not self.restrict_columns:
+            return []
+        return [load_only(*(getattr(self.cls, key) for key in sorted(self.columns)))]
+
+    def loader_options(self) -> list:
+        return [*self.relationship_options, *self.column_options()]
+
+
+def _plan_loading(schema, mapper, seen: frozenset) -> _LoadingPlan:
+    """Return the `_LoadingPlan` for dumping instances of ``mapper`` with
+    ``schema``.
+    """
+    cls = mapper.class_
+    columns = {
+        mapper.get_property_by_column(column).key for column in mapper.primary_key
+    }
+    options = []
+    # Fields that read unmapped attributes may read any column
+    restrict_columns = True
+
+    def load_relationship(relationship, *sub_options):
+        strategy = selectinload if relationship.uselist else joinedload
+        option = strategy(getattr(cls, relationship.key))
+        return option.options(*sub_options) if sub_options else option
+
+    def load_attribute(name):
+        nonlocal restrict_columns
+        prop = mapper.attrs[name] if name in mapper.attrs else None
+        if isinstance(prop, ColumnProperty):
+            columns.add(name)
+        elif isinstance(prop, RelationshipProperty):
+            options.append(load_relationship(prop))
+        else:
+            restrict_columns = False
+
+    for field_name, field in schema.dump_fields.items():
+        if isinstance(field, Config):
+            continue
+        if isinstance(field, (URLFor, Hyperlinks)):
+            names = _url_attr_names(field)
+            if names is None:
+                restrict_columns = False
+            for name in names or ():
+                load_attribute(name.split(".", 1)[0])
+            continue
+        if not field._CHECK_ATTRIBUTE:
+            restrict_columns = False
+            continue
+        name = field.attribute or field_name
+        if "." in name or name not in mapper.relationships:
+            load_attribute(name.split(".", 1)[0])
+            continue
+        relationship = mapper.relationships[name]
+        inner = field.inner if isinstance(field, fields.List) else field
+        if isinstance(field, HyperlinkRelatedList):
+            if field._get_key_query(cls, name) is not None:
+                # The related keys are selected separately
+                continue
+        elif isinstance(field, HyperlinkRelated):
+            local_key_attr = field._get_local_key_attr(cls, name)
+            if local_key_attr is not None:
+                columns.add(local_key_attr)
+                continue
+        if isinstance(inner, msqla.fields.Related):
+            related_mapper = relationship.mapper
+            if inner.columns:
+                keys = list(inner.columns)
+            else:
+                keys = [
+                    related_mapper.get_property_by_column(column).key
+                    for column in related_mapper.primary_key
+                ]
+            related_cls = related_mapper.class_
+            options.append(
+                load_relationship(relationship).load_only(
+                    *(getattr(related_cls, key) for key in keys)
+                )
+            )
+        elif isinstance(inner, fields.Nested):
+            nested = inner.schema
+            key = (type(nested), frozenset(nested.dump_fields), relationship.mapper)
+            if key in seen:
+                options.append(load_relationship(relationship))
+            else:
+                sub_plan = _plan_loading(nested, relationship.mapper, seen | {key})
+                options.append(
+                    load_relationship(relationship, *sub_plan.loader_options())
+                )
+        else:
+            options.append(load_relationship(relationship))
+
+    return _LoadingPlan(cls, frozenset(columns), restrict_columns, tuple(options))
+
+
+def _row_serializer(field_name, field, index, model):
+    """Return a function that serializes ``field`` from a row, reading the
+    columns at the positions given by ``index``, or `None` if the field can't
+    be serialized by index.
+    """
+    name = field.attribute or field_name
+    if isinstance(field, (URLFor, Hyperlinks)):
+        if isinstance(field, Hyperlinks):
+            getters = field._getters
+            build = functools.partial(field._links_for_attrs, field_name)
+        else:
+            getters = field._url_getters
+            build = field._url_for_attrs
+        # Dotted attributes are read from the row as usual
+        row_getters = [
+            (attr_name, operator.itemgetter(index[attr_name]))
+            if attr_name in index
+            else (attr_name, get)
+            for attr_name, get in getters
+        ]
+
+        def serialize_urls(row):
+            return build(row, {attr_name: get(row) for attr_name, get in row_getters})
+
+        return serialize_urls
+    if name in index:
+        if not field._CHECK_ATTRIBUTE or type(field).serialize is not (
+            fields.Field.serialize
+        ):
+            return None
+        position, serialize_value = index[name], field._serialize
+
+        def serialize_column(row):
+            return serialize_value(row[position], field_name, row)
+
+        return serialize_column
+    if isinstance(field, HyperlinkRelated) and model is not None:
+        local_key_attr = field._get_local_key_attr(model, name)
+        if local_key_attr in index:
+            position, url_for_key = index[local_key_attr], field._url_for_key
+
+            def serialize_foreign_key(row):
+                key = row[position]
+                return None if key is None else url_for_key(key)
+
+            return serialize_foreign_key
+    return None
+
+
+def _selects_entity(select) -> bool:
+    """Return whether ``select`` selects a single ORM entity."""
+    descriptions = select.column_descriptions
+    return (
+        len(descriptions) == 1
+        and descriptions[0]["expr"] is (descriptions[0]["entity"])
+    )
+
+
+class FlaskSQLAlchemySchemaMixin:
+    """Features shared by `SQLAlchemySchema` and `SQLAlchemyAutoSchema`.
+
+    Set the ``hyperlink_related`` class Meta option to a dict that maps
+    relationship names to endpoints (or to a dict of `HyperlinkRelated`
+    arguments) to generate `HyperlinkRelated` fields for many-to-one
+    relationships and `HyperlinkRelatedList` fields for collections, instead of
+    `Related <marshmallow_sqlalchemy.fields.Related>` fields. ::
+
+        class AuthorSchema(ma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = Author
+                include_relationships = True
+                hyperlink_related = {"books": "book_detail"}
+
+    On ``many=True`` dumps, the related keys of every `HyperlinkRelatedList`
+    field are fetched for all objects at once, with one query per field.
+
+    Set the ``batch_related`` class Meta option to `True` to resolve
+    `Related <marshmallow_sqlalchemy.fields.Related>` and `HyperlinkRelated`
+    fields in batches on load: before the fields are deserialized, the primary
+    keys referenced across the whole payload (including nested schemas and
+    ``many=True`` loads) are fetched with one ``IN`` query per related model.
+    The fields then resolve their objects from the session's identity map.
+    Lookups by non-primary-key ``columns`` and composite keys are not batched.
+
+    Use `optimize_query` to load exactly what a dump with the schema reads, or
+    `project_query` to only load the columns it reads. On the variants returned
+    by `sparse <flask_marshmallow.Schema.sparse>`, they only load what the
+    selected fields read. Columns read by the
+    fields that aren't loaded on the dumped objects (deferred or expired
+    columns) are loaded before serializing, with one query per batch of
+    objects instead of one query per object and column.
+    """
+
+    @functools.cached_property
+    def _loading_plan(self) -> typing.Optional[_LoadingPlan]:
+        model = self.opts.model  # type: ignore[attr-defined]
+        if model is None:
+            return None
+        return _plan_loading(self, sa.inspect(model), frozenset())
+
+    def _precompute(self, provider):
+        super()._precompute(provider)
+        model = self.opts.model
+        if model is None:
+            return
+        self._loading_plan  # noqa: B018
+        for attr_name, field in self.dump_fields.items():
+            name = field.attribute or attr_name
+            if isinstance(field, HyperlinkRelatedList):
+                field._get_key_query(model, name)
+            elif isinstance(field, HyperlinkRelated):
+                field._get_local_key_attr(model, name)
+
+    def loader_options(self):
+        """Return the SQLAlchemy loader options that load what dumping the
+        ``model`` with this schema instance reads, given its ``only`` and
+        ``exclude`` options.
+
+        Relationships serialized by `Nested <marshmallow.fields.Nested>` and
+        `Related <marshmallow_sqlalchemy.fields.Related>` fields are eagerly
+        loaded with ``selectinload`` (collections) or ``joinedload``
+        (many-to-one), recursively for nested schemas. Only the columns read
+        by the fields are loaded, unless a field may read unmapped attributes
+        (e.g. a `Method <marshmallow.fields.Method>` field or a Python
+        property). `HyperlinkRelated` fields that can use the foreign key and
+        `HyperlinkRelatedList` fields don't load their relationship.
+        """
+        plan = self._loading_plan
+        return [] if plan is None else plan.loader_options()
+
+    def optimize_query(self, query):
+        """Return ``query``, a `Query <sqlalchemy.orm.Query>` or
+        `select() <sqlalchemy.sql.expression.select>` of the ``model``, with
+        the `loader_options` of this schema applied. ::
+
+            author_schema = AuthorSchema(only=("name", "books"))
+            authors = db.session.scalars(
+                author_schema.optimize_query(sa.select(Author))
+            ).all()
+            author_schema.dump(authors, many=True)
+        """
+        return query.options(*self.loader_options())
+
+    def project_query(self, query):
+        """Return ``query``, a `Query <sqlalchemy.orm.Query>` or
+        `select() <sqlalchemy.sql.expression.select>` of the ``model``,
+        restricted to the columns read by the fields of this schema instance
+        and the primary key.
+
+        Large columns that a schema built with ``only`` or ``exclude`` doesn't
+        dump aren't selected. The query is returned unchanged if a field may
+        read unmapped attributes (e.g. a `Method <marshmallow.fields.Method>`
+        field or a Python property).
+        """
+        plan = self._loading_plan
+        return query if plan is None else query.options(*plan.column_options())
+
+    def _variant_options(self):
+        options = super()._variant_options()
+        for name in ("session", "transient", "load_instance"):
+            value = getattr(self, f"_{name}", None)
+            if value is not None:
+                options[name] = value
+        return options
+
+    def dump_rows(self, rows):
+        """Serialize SQLAlchemy Core result rows, e.g. the `Result
+        <sqlalchemy.engine.Result>` of a ``select()`` of columns, without
+        loading ORM instances.
+
+        The fields are mapped to the positions of the row columns named after
+        their attribute once per call, and the values are read by index. The
+        ``< >`` attributes of `URLFor <flask_marshmallow.fields.URLFor>` and
+        `Hyperlinks <flask_marshmallow.fields.Hyperlinks>` fields are read
+        from the row columns, and `HyperlinkRelated` fields use the foreign
+        key column of their relationship (e.g. ``author_id``). Other fields
+        access the row by attribute, as with `dump`. ::
+
+            rows = db.session.execute(sa.select(Book.id, Book.title, Book.author_id))
+            book_schema.dump_rows(rows)
+
+        :param rows: A `Result <sqlalchemy.engine.Result>` or a sequence of
+            `Row <sqlalchemy.engine.Row>` objects.
+        :return: A list of serialized rows.
+        """
+        if _has_hooks(self, PRE_DUMP):
+            return self.dump(list(rows), many=True)
+        keys = list(rows.keys()) if hasattr(rows, "keys") else None
+        # A `Result` can only be iterated once, and the rows are passed to
+        # post_dump hooks as the original data
+        rows = list(rows)
+        if keys is None:
+            keys = list(rows[0]._fields) if rows else []
+        serializers = self._row_serializers(keys)
+        dict_class = self.dict_class
+        result = []
+        for row in rows:
+            ret = dict_class()
+            for key, serialize in serializers:
+                value = serialize(row)
+                if value is not missing:
+                    ret[key] = value
+            result.append(ret)
+        if _has_hooks(self, POST_DUMP):
+            result = self._invoke_dump_processors(
+                POST_DUMP, result, many=True, original_data=rows
+            )
+        return result
+
+    def jsonify_rows(self, rows, *args, **kwargs):
+        """Return a JSON response containing the rows serialized with
+        `dump_rows`. Additional arguments are passed to `flask.jsonify`.
+
+        Like `jsonify <flask_marshmallow.Schema.jsonify>`, encodes the data
+        with the app's JSON backend if one is set and no additional arguments
+        are passed.
+        """
+        data = self.dump_rows(rows)
+        app = current_app._get_current_object()
+        backend = get_json_backend(app)
+        if backend is None or args or kwargs or _pretty_json(app):
+            return jsonify(data, *args, **kwargs)
+        return backend.response(data)
+
+    def jsonify_stream(self, obj, batch_size=STREAM_BATCH_SIZE):
+        """Return a streamed JSON response containing the serialized
+        collection ``obj``, as a JSON array.
+
+        Same as `Schema.jsonify_stream <flask_marshmallow.Schema.jsonify_stream>`,
+        except that ``obj`` may also be a `Query <sqlalchemy.orm.Query>` or a
+        ``select()``, which is executed with ``yield_per(batch_size)`` when the
+        response is sent. The rows of a ``select()`` of columns rather than of
+        the ``model`` are serialized with `dump_rows`. ::
+
+            @app.route("/export/books")
+            def export_books():
+                return book_schema.jsonify_stream(sa.select(Book))
+        """
+        return super().jsonify_stream(obj, batch_size)
+
+    def _dump_batches(self, obj, batch_size):
+        if isinstance(obj, sa.orm.Query):
+            obj = obj.yield_per(batch_size)
+        elif isinstance(obj, sa.sql.Select):
+            select = obj.execution_options(yield_per=batch_size)
+            if _selects_entity(select):
+                for batch in self.session.scalars(select).partitions():
+                    yield self.dump(batch, many=True)
+            else:
+                for batch in self.session.execute(select).partitions():
+                    yield self.dump_rows(batch)
+            return
+        yield from super()._dump_batches(obj, batch_size)
+
+    def _row_serializers(self, keys):
+        """Return ``(data key, function)`` pairs that serialize the dump
+        fields from rows with the columns ``keys``.
+        """
+        index = {key: i for i, key in enumerate(keys)}
+        model = self.opts.model
+        by_index = type(self).get_attribute is ma.Schema.get_attribute
+        serializers = []
+        for field_name, field in self.dump_fields.items():
+            data_key = field.data_key if field.data_key is not None else field_name
+            serialize = None
+            if by_index:
+                serialize = _row_serializer(field_name, field, index, model)
+            if serialize is None:
+                serialize = functools.partial(
+                    field.serialize, field_name, accessor=self.get_attribute
+                )
+            serializers.append((data_key, serialize))
+        return serializers
+
+    def _do_load(self, data, *args, **kwargs):
+        if (
+            not self.opts.batch_related
+            or self.transient
+            or isinstance(self.session, (DummySession, type(None)))
+            or _batching_related.get()
+        ):
+            return super()._do_load(data, *args, **kwargs)
+        many = kwargs.get("many")
+        many = self.many if many is None else bool(many)
+        token = _batching_related.set(True)
+        try:
+            collected = {}
+            _collect_related_keys(self, data, many, collected)
+            # The identity map only holds weak references, so keep the
+            # prefetched objects alive until the fields have looked them up
+            prefetched = self._prefetch_related(collected)  # noqa: F841
+            return super()._do_load(data, *args, **kwargs)
+        finally:
+            _batching_related.reset(token)
+
+    @contextlib.contextmanager
+    def _dump_context(self, obj, many):
+        if not many:
+            self._load_columns([obj])
+            yield obj
+            return
+        obj = list(obj)
+        self._load_columns(obj)
+        list_fields = [
+            (attr_name, field)
+            for attr_name, field in self.dump_fields.items()
+            if isinstance(field, HyperlinkRelatedList)
+        ]
+        if not list_fields:
+            yield obj
+            return
+        prefetched = dict(_prefetched_related_keys.get() or {})
+        for attr_name, field in list_fields:
+            prefetched[field] = field._prefetch_keys(attr_name, obj)
+        token = _prefetched_related_keys.set(prefetched)
+        try:
+            yield obj
+        finally:
+            _prefetched_related_keys.reset(token)
+
+    def _load_columns(self, objs):
+        """Load the columns read by the fields that aren't loaded on the
+        persistent ``objs``.
+        """
+        plan = self._loading_plan
+        if plan is None:
+            return
+        pending = {}
+        for obj in objs:
+            if not isinstance(obj, plan.cls):
+                continue
+            state_dict = obj.__dict__
+            missing = [key for key in plan.columns if key not in state_dict]
+            if not missing:
+                continue
+            state = sa.inspect(obj)
+            if state.identity is None or state.session is None or state.deleted:
+                continue
+            if len(state.identity) != 1:
+                # Composite keys are left to the regular attribute loading
+                continue
+            ids, keys = pending.setdefault(state.session, ([], set()))
+            ids.append(state.identity[0])
+            keys.update(missing)
+        if not pending:
+            return
+        mapper = sa.inspect(plan.cls)
+        primary_key = getattr(
+            plan.cls, mapper.get_property_by_column(mapper.primary_key[0]).key
+        )
+        for session, (ids, keys) in pending.items():
+            select = sa.select(plan.cls).options(
+                load_only(*(getattr(plan.cls, key) for key in sorted(keys)))
+            )
+            with session.no_autoflush:
+                for start in range(0, len(ids), BATCH_RELATED_SIZE):
+                    batch = ids[start : start + BATCH_RELATED_SIZE]
+                    # Rows populate the unloaded attributes of the objects
+                    # already in the identity map
+                    session.execute(select.where(primary_key.in_(batch))).all()
+
+    def _prefetch_related(self, collected):
+        """Load the related objects for the collected keys into the session."""
+        prefetched = []
+        for (model, key_name), keys in collected.items():
+            column = getattr(model, key_name)
+            keys = list(keys)
+            for start in range(0, len(keys), BATCH_RELATED_SIZE):
+                batch = keys[start : start + BATCH_RELATED_SIZE]
+                prefetched.extend(
+                    self.session.query(model).filter(column.in_(batch)).all()
+                )
+        return prefetched
 
 
 # SQLAlchemySchema and SQLAlchemyAutoSchema are available in newer ma-sqla versions
@@ -38,7 +638,7 @@ if hasattr(msqla, "SQLAlchemySchema"):
     class SQLAlchemySchemaOpts(FlaskSQLAlchemyOptsMixin, msqla.SQLAlchemySchemaOpts):
         pass
 
-    class SQLAlchemySchema(msqla.SQLAlchemySchema, Schema):
+    class SQLAlchemySchema(FlaskSQLAlchemySchemaMixin, msqla.SQLAlchemySchema, Schema):
         """SQLAlchemySchema that associates a schema with a model via the
         `model` class Meta option, which should be a
         ``db.Model`` class from `flask_sqlalchemy`. Uses the
@@ -60,7 +660,9 @@ if hasattr(msqla, "SQLAlchemyAutoSchema"):
     ):
         pass
 
-    class SQLAlchemyAutoSchema(msqla.SQLAlchemyAutoSchema, Schema):
+    class SQLAlchemyAutoSchema(
+        FlaskSQLAlchemySchemaMixin, msqla.SQLAlchemyAutoSchema, Schema
+    ):
         """SQLAlchemyAutoSchema that automatically generates marshmallow fields
         from a SQLAlchemy model's or table's column.
         Uses the scoped session from Flask-SQLAlchemy by default.
@@ -77,6 +679,35 @@ else:
 auto_field = getattr(msqla, "auto_field", None)
 
 
+class HyperlinkModelConverter(msqla.ModelConverter):
+    """`ModelConverter <marshmallow_sqlalchemy.ModelConverter>` that generates
+    `HyperlinkRelated` and `HyperlinkRelatedList` fields for the relationships
+    listed in the ``hyperlink_related`` class Meta option.
+    """
+
+    def property2field(self, prop, *, instance=True, field_class=None, **kwargs):
+        hyperlink_related = getattr(
+            getattr(self.schema_cls, "opts", None), "hyperlink_related", {}
+        )
+        if not hasattr(prop, "direction") or prop.key not in hyperlink_related:
+            return super().property2field(
+                prop, instance=instance, field_class=field_class, **kwargs
+            )
+        field_cls = HyperlinkRelatedList if prop.uselist else HyperlinkRelated
+        if not instance:
+            return field_cls
+        hyperlink_kwargs = hyperlink_related[prop.key]
+        if isinstance(hyperlink_kwargs, str):
+            hyperlink_kwargs = {"endpoint": hyperlink_kwargs}
+        field_kwargs = self._get_field_kwargs_for_property(prop)
+        if prop.uselist:
+            # Collections are never required, and the list itself isn't nullable
+            field_kwargs.pop("allow_none", None)
+        field_kwargs.update(hyperlink_kwargs)
+        field_kwargs.update(kwargs)
+        return field_cls(**field_kwargs)
+
+
 class HyperlinkRelated(msqla.fields.Related):
     """Field that generates hyperlinks to indicate references between models,
     rather than primary keys.
@@ -86,6 +717,10 @@ class HyperlinkRelated(msqla.fields.Related):
         key. Defaults to "id".
     :param bool external: Set to `True` if absolute URLs should be used,
         instead of relative URLs.
+
+    For a many-to-one relationship whose foreign key is a column of the parent
+    model, the URL is built from the foreign key when the relationship isn't
+    loaded yet, so serializing doesn't query the related object.
     """
 
     def __init__(
@@ -95,30 +730,234 @@ class HyperlinkRelated(msqla.fields.Related):
         self.endpoint = endpoint
         self.url_key = url_key
         self.external = external
+        self._local_key_attrs: typing.Dict[type, typing.Optional[str]] = {}
+
+    def serialize(self, attr, obj, accessor=None, **kwargs):
+        name = self.attribute or attr
+        local_key_attr = self._get_local_key_attr(type(obj), name)
+        if local_key_attr is not None:
+            state = obj.__dict__
+            # Only use the foreign key if the relationship isn't loaded, since a
+            # loaded relationship may have changed without a flush
+            if name not in state and local_key_attr in state:
+                key = state[local_key_attr]
+                return None if key is None else self._url_for_key(key)
+        return super().serialize(attr, obj, accessor=accessor, **kwargs)
 
     def _serialize(self, value, attr, obj):
         if value is None:
             return None
         key = super()._serialize(value, attr, obj)
-        kwargs = {self.url_key: key}
-        return url_for(self.endpoint, _external=self.external, **kwargs)
+        return self._url_for_key(key)
+
+    def _url_for_key(self, key):
+        return build_url(self.endpoint, {self.url_key: key}, self.external)
+
+    def _get_local_key_attr(self, cls: type, name: str) -> typing.Optional[str]:
+        """Return the attribute of ``cls`` holding the foreign key of its
+        ``name`` relationship, or `None` if there isn't one.
+        """
+        try:
+            return self._local_key_attrs[cls]
+        except KeyError:
+            pass
+        local_key_attr = None
+        mapper: typing.Any = sa.inspect(cls, raiseerr=False)
+        relationship = (
+            mapper.relationships.get(name) if isinstance(mapper, Mapper) else None
+        )
+        if (
+            relationship is not None
+            and relationship.direction is MANYTOONE
+            and relationship.secondary is None
+        ):
+            related_mapper = relationship.mapper
+            if self.columns:
+                target_columns = [
+                    related_mapper.attrs[column].columns[0] for column in self.columns
+                ]
+            else:
+                target_columns = list(related_mapper.primary_key)
+            if len(target_columns) == 1:
+                for local, remote in relationship.local_remote_pairs:
+                    if remote is target_columns[0]:
+                        try:
+                            prop = mapper.get_property_by_column(local)
+                        except UnmappedColumnError:
+                            break
+                        local_key_attr = prop.key
+                        break
+        self._local_key_attrs[cls] = local_key_attr
+        return local_key_attr
 
     def _deserialize(self, value, *args, **kwargs):
+        return super()._deserialize(self._get_url_key(value), *args, **kwargs)
+
+    def _get_url_key(self, value):
+        """Return the value of ``url_key`` parsed from the URL ``value``."""
         if self.external:
             parsed = parse.urlparse(value)
             value = parsed.path
-        endpoint, kwargs = self.adapter.match(value)
-        if endpoint != self.endpoint:
+        app = current_app._get_current_object()
+        matcher = get_url_matcher(app, self.endpoint)
+        url_kwargs = matcher.match(value) if matcher is not None else None
+        if url_kwargs is None:
+            endpoint, url_kwargs = get_url_adapter(app).match(value)
+            if endpoint != self.endpoint:
+                raise ValidationError(
+                    f'Parsed endpoint "{endpoint}" from URL "{value}"; expected '
+                    f'"{self.endpoint}"'
+                )
+        if self.url_key not in url_kwargs:
             raise ValidationError(
-                f'Parsed endpoint "{endpoint}" from URL "{value}"; expected '
-                f'"{self.endpoint}"'
+                f'URL pattern "{self.url_key}" not found in {url_kwargs!r}'
             )
-        if self.url_key not in kwargs:
-            raise ValidationError(
-                f'URL pattern "{self.url_key}" not found in {kwargs!r}'
-            )
-        return super()._deserialize(kwargs[self.url_key], *args, **kwargs)
+        return url_kwargs[self.url_key]
 
     @property
     def adapter(self):
-        return current_app.url_map.bind("")
+        return get_url_adapter(current_app._get_current_object())
+
+
+class _RelatedKeysQuery:
+    """Selects the related keys of a collection relationship for many parents
+    at once, without loading the related objects.
+    """
+
+    def __init__(self, relationship, parent_key_name, related_key):
+        parent = relationship.parent.class_
+        if relationship.mapper.common_parent(relationship.parent):
+            # Self-referential relationships join two distinct entities. The
+            # parent is aliased, so that ``order_by`` applies to the related
+            # objects
+            parent = sa.orm.aliased(parent)
+        self.parent_key = getattr(parent, parent_key_name)
+        select = sa.select(self.parent_key, related_key).select_from(parent)
+        select = select.join(getattr(parent, relationship.key))
+        if relationship.order_by:
+            select = select.order_by(*relationship.order_by)
+        self.select = select
+
+    def fetch(
+        self, session, parent_ids: typing.Sequence
+    ) -> typing.Dict[typing.Any, list]:
+        related_keys: typing.Dict[typing.Any, list] = {
+            parent_id: [] for parent_id in parent_ids
+        }
+        for start in range(0, len(parent_ids), BATCH_RELATED_SIZE):
+            batch = parent_ids[start : start + BATCH_RELATED_SIZE]
+            for parent_id, key in session.execute(
+                self.select.where(self.parent_key.in_(batch))
+            ):
+                related_keys[parent_id].append(key)
+        return related_keys
+
+
+class HyperlinkRelatedList(msqla.fields.RelatedList):
+    """List of hyperlinks for a one-to-many or many-to-many relationship.
+
+    When the relationship isn't loaded, only the primary keys of the related
+    objects are selected to build the URLs; the related objects are never
+    loaded. On ``many=True`` dumps with `SQLAlchemySchema` or
+    `SQLAlchemyAutoSchema`, the keys are selected for all objects at once.
+
+    :param str endpoint: Flask endpoint name for generated hyperlinks.
+    :param str url_key: The attribute containing the references' primary
+        key. Defaults to "id".
+    :param bool external: Set to `True` if absolute URLs should be used,
+        instead of relative URLs.
+    :param list columns: Optional column names on the related model. If not
+        provided, the primary key of the related model will be used.
+    :param kwargs: keyword arguments to pass to marshmallow's
+        `List <marshmallow.fields.List>` field.
+    """
+
+    inner: HyperlinkRelated
+
+    def __init__(
+        self,
+        endpoint: str,
+        url_key: str = "id",
+        external: bool = False,
+        columns=None,
+        **kwargs,
+    ):
+        super().__init__(
+            HyperlinkRelated(
+                endpoint, url_key=url_key, external=external, columns=columns
+            ),
+            **kwargs,
+        )
+        self._key_queries: typing.Dict[type, typing.Optional[_RelatedKeysQuery]] = {}
+
+    def serialize(self, attr, obj, accessor=None, **kwargs):
+        name = self.attribute or attr
+        key_query = self._get_key_query(type(obj), name)
+        if key_query is not None and name not in obj.__dict__:
+            state = sa.inspect(obj)
+            if state.identity is not None and state.session is not None:
+                parent_id = state.identity[0]
+                prefetched = (_prefetched_related_keys.get() or {}).get(self, {})
+                if parent_id in prefetched:
+                    keys = prefetched[parent_id]
+                else:
+                    keys = key_query.fetch(state.session, [parent_id])[parent_id]
+                return [self.inner._url_for_key(key) for key in keys]
+        return super().serialize(attr, obj, accessor=accessor, **kwargs)
+
+    def _prefetch_keys(self, attr: str, objs: typing.Iterable) -> typing.Dict:
+        """Select the related keys of all ``objs`` that don't have the
+        relationship loaded, keyed by parent primary key.
+        """
+        name = self.attribute or attr
+        parent_ids: typing.Dict[typing.Any, list] = defaultdict(list)
+        for obj in objs:
+            key_query = self._get_key_query(type(obj), name)
+            if key_query is None or name in obj.__dict__:
+                continue
+            state = sa.inspect(obj)
+            if state.identity is not None and state.session is not None:
+                parent_ids[key_query, state.session].append(state.identity[0])
+        prefetched = {}
+        for (key_query, session), ids in parent_ids.items():
+            prefetched.update(key_query.fetch(session, ids))
+        return prefetched
+
+    def _get_key_query(
+        self, cls: type, name: str
+    ) -> typing.Optional[_RelatedKeysQuery]:
+        try:
+            return self._key_queries[cls]
+        except KeyError:
+            pass
+        key_query = None
+        mapper: typing.Any = sa.inspect(cls, raiseerr=False)
+        relationship = (
+            mapper.relationships.get(name) if isinstance(mapper, Mapper) else None
+        )
+        if (
+            relationship is not None
+            and relationship.uselist
+            and relationship.lazy not in ("dynamic", "write_only")
+            and len(mapper.primary_key) == 1
+        ):
+            related_mapper = relationship.mapper
+            if self.inner.columns:
+                related_keys = [
+                    related_mapper.attrs[column] for column in self.inner.columns
+                ]
+            else:
+                related_keys = [
+                    related_mapper.get_property_by_column(column)
+                    for column in related_mapper.primary_key
+                ]
+            if len(related_keys) == 1:
+                parent_key_name = mapper.get_property_by_column(
+                    mapper.primary_key[0]
+                ).key
+                related_key = getattr(related_mapper.class_, related_keys[0].key)
+                key_query = _RelatedKeysQuery(
+                    relationship, parent_key_name, related_key
+                )
+        self._key_queries[cls] = key_query
+        return key_query
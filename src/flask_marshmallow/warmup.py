@@ -0,0 +1,286 @@
+"""
+flask_marshmallow.warmup
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Moves the work done by the first requests that use each schema to startup.
+
+`warm_up` instantiates every schema class in marshmallow's class registry,
+resolves their nested schemas and compiles the URL rules of their hyperlink
+fields against the app's URL map. Call it through `Marshmallow.warm_up
+<flask_marshmallow.Marshmallow.warm_up>` once the schemas are imported and the
+views registered, or set ``MARSHMALLOW_WARM_UP`` in the app config to run it
+from `Marshmallow.init_app <flask_marshmallow.Marshmallow.init_app>`.
+
+With a pre-forking server, `freeze` then finalizes the warmed up schemas in
+the parent process, so that the workers share them instead of each building
+and modifying its own copies. For example, with gunicorn's ``--preload``
+option: ::
+
+    # wsgi.py
+    app = create_app()
+    ma.warm_up(app)
+    ma.freeze(app, gc_freeze=True)
+"""
+
+import gc
+import sys
+import time
+import types
+import typing
+
+import marshmallow as ma
+from marshmallow import class_registry
+from marshmallow.decorators import (
+    POST_DUMP,
+    POST_LOAD,
+    PRE_DUMP,
+    PRE_LOAD,
+    VALIDATES,
+    VALIDATES_SCHEMA,
+)
+
+from .fields import Hyperlinks
+from .registry import SchemaRegistry
+from .routing import get_url_adapter, get_url_builder, get_url_matcher
+from .schema import Schema, _fusable_provider
+
+if typing.TYPE_CHECKING:
+    from flask import Flask
+
+_HOOK_TAGS = (PRE_DUMP, POST_DUMP, PRE_LOAD, POST_LOAD, VALIDATES, VALIDATES_SCHEMA)
+
+# Packages whose schema classes are base classes, not application schemas
+_LIBRARY_PACKAGES = frozenset(
+    ("marshmallow", "marshmallow_sqlalchemy", "flask_marshmallow")
+)
+
+
+class WarmUpReport(typing.NamedTuple):
+    """What `warm_up` did, and how long each step took, in seconds."""
+
+    #: Number of schema classes instantiated
+    schemas: int
+    #: Number of nested schemas resolved
+    nested: int
+    #: Number of endpoints whose URL rules were compiled. Endpoints that
+    #: aren't registered yet are compiled on first use.
+    endpoints: int
+    #: Exceptions raised by schema classes that couldn't be instantiated,
+    #: keyed by class
+    errors: typing.Dict[type, Exception]
+    #: Durations of the ``"collect"``, ``"instantiate"``, ``"nested"`` and
+    #: ``"urls"`` steps
+    timings: typing.Dict[str, float]
+
+    def __str__(self):
+        timings = ", ".join(
+            f"{step} {duration * 1000:.1f} ms"
+            for step, duration in self.timings.items()
+        )
+        return (
+            f"Warmed up {self.schemas} schemas, {self.nested} nested schemas and "
+            f"{self.endpoints} endpoints ({timings}); {len(self.errors)} errors"
+        )
+
+
+class FreezeReport(typing.NamedTuple):
+    """What `freeze` did."""
+
+    #: Number of schema instances frozen, including nested schemas
+    schemas: int
+    #: Number of fields of the frozen schemas
+    fields: int
+    #: Exceptions raised while resolving nested schemas, keyed by the class
+    #: of the schema that nests them. Those nested schemas aren't frozen.
+    errors: typing.Dict[type, Exception]
+    #: Number of objects moved to the permanent generation by `gc.freeze`,
+    #: or ``0``
+    gc_frozen: int
+
+    def __str__(self):
+        return (
+            f"Froze {self.schemas} schemas with {self.fields} fields; "
+            f"{self.gc_frozen} objects moved to the permanent generation; "
+            f"{len(self.errors)} errors"
+        )
+
+
+def registered_schemas() -> typing.List[typing.Type[ma.Schema]]:
+    """Return the application's schema classes registered in marshmallow's
+    class registry, without the base classes of the libraries.
+    """
+    classes: typing.Dict[type, None] = {}
+    for registered in class_registry._registry.values():
+        for schema_class in registered:
+            if schema_class.__module__.partition(".")[0] not in _LIBRARY_PACKAGES:
+                classes[schema_class] = None
+    return list(classes)
+
+
+def _nested_schemas(field: ma.fields.Field) -> typing.Iterator[ma.Schema]:
+    if isinstance(field, ma.fields.Nested):
+        yield field.schema
+    elif isinstance(field, ma.fields.List):
+        yield from _nested_schemas(field.inner)
+    elif isinstance(field, ma.fields.Tuple):
+        for each in field.tuple_fields:
+            yield from _nested_schemas(each)
+    elif isinstance(field, ma.fields.Dict) and field.value_field is not None:
+        yield from _nested_schemas(field.value_field)
+
+
+def _url_fields(field: ma.fields.Field) -> typing.Iterator[ma.fields.Field]:
+    if isinstance(field, Hyperlinks):
+        for _, _, url_field, _ in field._slots:
+            yield url_field
+    elif isinstance(field, ma.fields.List):
+        yield from _url_fields(field.inner)
+    elif isinstance(getattr(field, "endpoint", None), str):
+        yield field
+
+
+def _shape(schema: ma.Schema) -> typing.Hashable:
+    only = None if schema.only is None else tuple(schema.only)
+    return type(schema), only, frozenset(schema.exclude)
+
+
+def _schema_fields(schema: ma.Schema) -> typing.Iterator[ma.fields.Field]:
+    yield from schema.dump_fields.values()
+    for name, field in schema.load_fields.items():
+        if name not in schema.dump_fields:
+            yield field
+
+
+def _resolve_nested(
+    schemas: typing.Iterable[ma.Schema], errors: typing.Dict[type, Exception]
+) -> typing.List[ma.Schema]:
+    """Resolve the nested schemas of ``schemas``, recursively, and return all
+    the schema instances reached. Exceptions raised while resolving the nested
+    schemas of a schema are stored in ``errors``.
+    """
+    visited = []
+    # A schema isn't expanded inside a schema of the same shape, which stops
+    # recursion through self-referencing schemas
+    pending: typing.List[typing.Tuple[ma.Schema, typing.FrozenSet]] = [
+        (schema, frozenset()) for schema in schemas
+    ]
+    while pending:
+        schema, ancestors = pending.pop()
+        visited.append(schema)
+        ancestors = ancestors | {_shape(schema)}
+        for field in _schema_fields(schema):
+            try:
+                nested_schemas = list(_nested_schemas(field))
+            except Exception as error:
+                errors.setdefault(type(schema), error)
+                continue
+            for nested in nested_schemas:
+                if _shape(nested) in ancestors:
+                    visited.append(nested)
+                else:
+                    pending.append((nested, ancestors))
+    return visited
+
+
+def warm_up(
+    app: "Flask",
+    registry: SchemaRegistry,
+    schema_classes: typing.Optional[typing.Iterable[typing.Type[ma.Schema]]] = None,
+) -> WarmUpReport:
+    """Instantiate ``schema_classes`` (by default, the `registered_schemas`)
+    with their default options and store the instances in ``registry``,
+    resolve their nested schemas, and compile the URL rules of their
+    hyperlink fields against ``app.url_map``.
+    """
+    timings: typing.Dict[str, float] = {}
+    errors: typing.Dict[type, Exception] = {}
+
+    start = time.perf_counter()
+    if schema_classes is None:
+        schema_classes = registered_schemas()
+    timings["collect"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    schemas = []
+    for schema_class in schema_classes:
+        try:
+            schemas.append(registry.get(schema_class))
+        except Exception as error:
+            errors[schema_class] = error
+    timings["instantiate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    visited = _resolve_nested(schemas, errors)
+    timings["nested"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sqla = sys.modules.get(f"{__package__}.sqla")
+    endpoints = set()
+    for schema in visited:
+        for field in _schema_fields(schema):
+            for url_field in _url_fields(field):
+                endpoint = url_field.endpoint  # type: ignore[attr-defined]
+                if get_url_builder(app, endpoint) is not None:
+                    endpoints.add(endpoint)
+                if sqla is not None and isinstance(url_field, sqla.HyperlinkRelated):
+                    get_url_matcher(app, endpoint)
+                    get_url_adapter(app)
+    timings["urls"] = time.perf_counter() - start
+
+    return WarmUpReport(
+        len(schemas), len(visited) - len(schemas), len(endpoints), errors, timings
+    )
+
+
+def _freeze_schema(schema: ma.Schema, provider: typing.Any) -> bool:
+    if isinstance(schema.fields, types.MappingProxyType):
+        return False
+    if isinstance(schema, Schema):
+        schema._precompute(provider)
+    schema.fields = types.MappingProxyType(schema.fields)  # type: ignore[assignment]
+    schema.dump_fields = types.MappingProxyType(schema.dump_fields)  # type: ignore[assignment]
+    schema.load_fields = types.MappingProxyType(schema.load_fields)  # type: ignore[assignment]
+    # The class's hooks are a defaultdict, which adds keys on first lookup.
+    # Older marshmallow versions key them by ``(tag, pass_many)``
+    hooks: typing.Mapping[typing.Any, typing.Any] = schema._hooks
+    keys = {*hooks, *_HOOK_TAGS}
+    keys.update((tag, pass_many) for tag in _HOOK_TAGS for pass_many in (True, False))
+    schema._hooks = types.MappingProxyType(  # type: ignore[assignment]
+        {key: tuple(hooks.get(key, ())) for key in keys}
+    )
+    return True
+
+
+def freeze(
+    app: "Flask", registry: SchemaRegistry, gc_freeze: bool = False
+) -> FreezeReport:
+    """Finalize the schemas in ``registry`` and their nested schemas, so that
+    requests read them without modifying them.
+
+    Nested schemas are resolved, the state that dumps compute on first use
+    is computed (the plans `Schema.jsonify <flask_marshmallow.Schema.jsonify>`
+    builds for ``app``'s JSON provider, and the loading plans and related key
+    lookups of the sqla schemas), and the fields and hooks of each schema are
+    replaced by read-only mappings, in which setting items raises
+    `TypeError`.
+
+    If ``gc_freeze`` is `True`, a garbage collection is run and all the
+    objects that survive it are moved to the permanent generation with
+    `gc.freeze`, so that the collector of forked workers doesn't write to
+    the memory pages they share with the parent process.
+    """
+    errors: typing.Dict[type, Exception] = {}
+    with registry._lock:
+        schemas = [schema for _, schema in registry._schemas.values()]
+    provider = _fusable_provider(app)
+    frozen = field_count = 0
+    for schema in _resolve_nested(schemas, errors):
+        if _freeze_schema(schema, provider):
+            frozen += 1
+            field_count += len(schema.fields)
+    gc_frozen = 0
+    if gc_freeze:
+        gc.collect()
+        gc.freeze()
+        gc_frozen = gc.get_freeze_count()
+    return FreezeReport(frozen, field_count, errors, gc_frozen)
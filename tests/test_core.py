@@ -1,9 +1,30 @@
+import gc
+import io
+import itertools
 import json
+import subprocess
+import sys
 
-from flask import Flask, url_for
+import pytest
+from flask import Flask, jsonify, url_for
+from marshmallow import (
+    EXCLUDE,
+    INCLUDE,
+    ValidationError,
+    fields,
+    post_dump,
+    pre_dump,
+    validate,
+    validates_schema,
+)
+from werkzeug.datastructures import FileStorage
 from werkzeug.wrappers import Response
 
-from flask_marshmallow import Marshmallow
+from flask_marshmallow import Marshmallow, Schema
+from flask_marshmallow import fields as ma_fields
+from flask_marshmallow.schema import SPARSE_CACHE_SIZE, _iter_json_array
+from flask_marshmallow.validate import FileSize, FileType
+from flask_marshmallow.warmup import registered_schemas
 
 
 def test_deferred_initialization():
@@ -14,6 +35,27 @@ def test_deferred_initialization():
     assert "flask-marshmallow" in app.extensions
 
 
+def test_lazy_attributes(ma):
+    assert ma.String is fields.String
+    assert ma.URLFor is ma_fields.URLFor
+    assert "String" in vars(ma)
+    assert "URLFor" in dir(ma)
+    with pytest.raises(AttributeError):
+        ma.NotAField  # noqa: B018
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys, flask_marshmallow\n"
+        "flask_marshmallow.Marshmallow().String\n"
+        "assert 'flask_sqlalchemy' not in sys.modules\n"
+        "assert flask_marshmallow.has_sqla\n"
+        "assert flask_marshmallow.Marshmallow().SQLAlchemySchema\n"
+        "assert 'flask_sqlalchemy' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
 def test_schema(app, schemas, mockauthor):
     s = schemas.AuthorSchema()
     result = s.dump(mockauthor)
@@ -59,3 +101,557 @@ def test_links_within_nested_object(app, schemas, mockbook):
     author = result["author"]
     assert author["links"]["self"] == url_for("author", id=mockbook.author.id)
     assert author["links"]["collection"] == url_for("authors")
+
+
+def test_jsonify_stream(app, schemas, mockauthorlist):
+    s = schemas.AuthorSchema()
+    resp = s.jsonify_stream(iter(mockauthorlist), batch_size=2)
+    assert isinstance(resp, Response)
+    assert resp.is_streamed
+    assert resp.content_type == "application/json"
+    chunks = list(resp.response)
+    assert len(chunks) == 4
+    obj = json.loads(b"".join(chunks))
+    assert obj == s.dump(mockauthorlist, many=True)
+
+
+def test_jsonify_stream_empty(app, schemas):
+    resp = schemas.AuthorSchema().jsonify_stream([])
+    assert json.loads(resp.get_data(as_text=True)) == []
+
+
+def test_jsonify_lines(app, schemas, mockauthorlist):
+    s = schemas.AuthorSchema()
+    resp = s.jsonify_lines(mockauthorlist, batch_size=2)
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    lines = resp.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == s.dump(mockauthorlist, many=True)
+
+
+def test_load_lines(ma):
+    class ItemSchema(ma.Schema):
+        id = ma.Integer(required=True)
+        name = ma.String()
+
+    body = b'{"id": 1, "name": "a"}\n\n{"name": "b"}\n{"id": \n{"id": 4}\n'
+    app = Flask("loadlines")
+    with app.test_request_context(method="POST", data=body):
+        results = list(ItemSchema().load_lines())
+    assert results[0] == {"id": 1, "name": "a"}
+    assert results[1].messages == {2: {"id": ["Missing data for required field."]}}
+    assert results[1].valid_data == {"name": "b"}
+    assert results[2].messages == {3: ["Invalid JSON."]}
+    assert results[3] == {"id": 4}
+    assert len(results) == 4
+
+    lines = iter(['{"id": "x"}', '{"id": 2}'])
+    with app.app_context():
+        results = list(ItemSchema().load_lines(lines))
+    assert results[0].messages == {0: {"id": ["Not a valid integer."]}}
+    assert results[1] == {"id": 2}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_iter_json_array(chunk_size):
+    items = [1, -2.5e3, 2e20, -0.25e-3, "é€😀", {"a": [1, {"b": None}]}, [], True, "x"]
+    body = (" \n[ " + " ,\n".join(json.dumps(item) for item in items) + " ]\n").encode()
+    stream = io.BytesIO(body)
+    assert list(_iter_json_array(stream, chunk_size)) == items
+    assert list(_iter_json_array(io.BytesIO(b" [ ] "), chunk_size)) == []
+    assert list(_iter_json_array(io.StringIO("[1,2]"), chunk_size)) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "body", [b"", b"{}", b"[1 2]", b"[1,]", b"[1", b"[1] 2", b'["\xff"]']
+)
+def test_iter_json_array_invalid(body):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.BytesIO(body), 2))
+
+
+class CountingStream(io.BytesIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_iter_json_array_invalid_item_stops_reading():
+    stream = CountingStream(b"[1, x" + b" " * 1024 * 1024)
+    with pytest.raises(ValueError):
+        list(_iter_json_array(stream, 1024))
+    assert stream.reads == 1
+
+
+def test_iter_json_array_large_item():
+    value = "a" * 1024 * 1024
+    stream = CountingStream(json.dumps([value, 1]).encode())
+    assert list(_iter_json_array(stream, 1024)) == [value, 1]
+    # The reads double in size while the item is incomplete
+    assert stream.reads < 20
+
+
+def test_load_stream(ma):
+    class ItemSchema(ma.Schema):
+        id = ma.Integer(required=True)
+
+    items = [{"id": 0}, {"id": "x"}, {"id": 2}, {}, {"id": 4}]
+    app = Flask("loadstream")
+    with app.test_request_context(method="POST", data=json.dumps(items)):
+        batches = []
+        with pytest.raises(ValidationError) as excinfo:
+            for batch in ItemSchema().load_stream(batch_size=2):
+                batches.append(batch)
+    assert batches == [[{"id": 0}], [{"id": 2}], [{"id": 4}]]
+    assert excinfo.value.messages == {
+        1: {"id": ["Not a valid integer."]},
+        3: {"id": ["Missing data for required field."]},
+    }
+
+    stream = io.BytesIO(b'[{"id": 1}, {"id": 2}, {"id": 3}')
+    batches = []
+    with pytest.raises(ValidationError) as excinfo:
+        for batch in ItemSchema().load_stream(stream, batch_size=2):
+            batches.append(batch)
+    assert batches == [[{"id": 1}, {"id": 2}]]
+    assert excinfo.value.messages == {"_schema": ["Invalid JSON."]}
+
+    stream = io.BytesIO(json.dumps(items[::2]).encode())
+    assert list(ItemSchema().load_stream(stream)) == [items[::2]]
+
+
+class FusedSchema(Schema):
+    id = fields.Int()
+    name = fields.Str(data_key="Name")
+    score = fields.Float()
+    active = fields.Bool()
+    tags = fields.List(fields.Str())
+    extra = fields.Raw()
+    missing_attr = fields.Str()
+
+
+FUSED_OBJS = [
+    {
+        "id": 1,
+        "name": "é😀\n",
+        "score": 1.5,
+        "active": True,
+        "tags": ["b", "a"],
+        "extra": {"z": 1, "a": [None, float("nan")]},
+    },
+    {"id": 2, "name": None, "score": float("inf"), "active": False, "tags": []},
+    {},
+]
+
+
+class KeyOrderSchema(Schema):
+    # Keys whose encoded forms don't sort like the keys
+    z = fields.Int()
+    e_acute = fields.Int(data_key="é")
+    a_bang = fields.Int(data_key="a!")
+    a_space = fields.Int(data_key="a b")
+    a = fields.Int()
+
+
+KEY_ORDER_OBJ = {"z": 1, "e_acute": 2, "a_bang": 3, "a_space": 4, "a": 5}
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_jsonify_fused_matches_jsonify(app, sort_keys, ensure_ascii, monkeypatch):
+    monkeypatch.setattr(app.json, "sort_keys", sort_keys)
+    monkeypatch.setattr(app.json, "ensure_ascii", ensure_ascii)
+    schema = FusedSchema()
+    assert schema._can_fuse_json()
+    cases = [
+        (schema, FUSED_OBJS, True),
+        (schema, FUSED_OBJS[0], False),
+        (schema, [], True),
+        (schema, None, True),
+        (schema, None, False),
+        (KeyOrderSchema(), KEY_ORDER_OBJ, False),
+    ]
+    for schema, obj, many in cases:
+        expected = jsonify(schema.dump(obj, many=many)).get_data()
+        assert schema.jsonify(obj, many=many).get_data() == expected
+        assert schema._fused_json(obj, many, app.json) == expected
+
+
+def test_jsonify_fused_nested(app, schemas, mockbook):
+    schema = schemas.BookSchema()
+    assert schema._can_fuse_json()
+    expected = jsonify(schema.dump(mockbook)).get_data()
+    assert schema.jsonify(mockbook).get_data() == expected
+
+
+def test_jsonify_fused_hooks(app):
+    class HookSchema(FusedSchema):
+        @pre_dump(pass_many=True)
+        def wrap(self, data, many, **kwargs):
+            return [{"id": item["id"] * 10} for item in data] if many else data
+
+    class PostHookSchema(FusedSchema):
+        @post_dump
+        def add(self, data, **kwargs):
+            data["post"] = True
+            return data
+
+    objs = [{"id": 1}, {"id": 2}]
+    for schema in (HookSchema(many=True), PostHookSchema(many=True)):
+        expected = jsonify(schema.dump(objs)).get_data()
+        assert schema.jsonify(objs).get_data() == expected
+    assert HookSchema()._can_fuse_json()
+    assert not PostHookSchema()._can_fuse_json()
+
+
+class CompiledSchema(FusedSchema):
+    count = fields.Int(dump_default=0)
+    created = fields.Str(dump_default=lambda: "now")
+    price = fields.Decimal(as_string=True)
+    code = fields.Int(as_string=True)
+    nested_name = fields.Str(attribute="meta.name")
+    nested_code = fields.Str(attribute="meta.code", dump_default="none")
+    upper = fields.Method("get_upper")
+    constant = fields.Constant(42)
+
+    def get_upper(self, obj):
+        return str(obj.get("name")).upper()
+
+
+COMPILED_OBJS = FUSED_OBJS + [
+    {"id": "3", "name": 4, "score": 2, "active": "yes", "code": 5, "price": 1.25},
+    {"id": 4, "count": None, "meta": {"name": "x"}, "extra": None},
+    {"id": 5, "meta": None},
+]
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"only": ("id", "upper")}, {"exclude": ("tags",)}]
+)
+def test_compile_dump(kwargs):
+    schema = CompiledSchema(many=True, **kwargs)
+    expected = schema.dump(COMPILED_OBJS)
+    assert schema.compile_dump()
+    assert schema._compiled_dump is not None
+    assert schema.dump(COMPILED_OBJS) == expected
+    assert schema.dump(COMPILED_OBJS[0], many=False) == expected[0]
+
+
+def test_compile_dump_links(app, schemas, mockauthor, mockbook):
+    for schema, obj in [
+        (schemas.AuthorSchema(), mockauthor),
+        (schemas.BookSchema(), mockbook),
+    ]:
+        expected = schema.dump(obj)
+        assert schema.compile_dump()
+        assert schema.dump(obj) == expected
+
+
+def test_compile_dump_fallback():
+    class AccessorSchema(CompiledSchema):
+        def get_attribute(self, obj, attr, default):
+            return (
+                "custom"
+                if attr == "name"
+                else super().get_attribute(obj, attr, default)
+            )
+
+    class SerializeSchema(CompiledSchema):
+        def _serialize(self, obj, *, many=False):
+            return {"serialized": True}
+
+    schema = AccessorSchema(many=True)
+    expected = schema.dump(COMPILED_OBJS)
+    assert schema.compile_dump()
+    assert schema.dump(COMPILED_OBJS) == expected
+    assert expected[0]["Name"] == "custom"
+
+    schema = SerializeSchema()
+    assert not schema.compile_dump()
+    assert schema.dump({}) == {"serialized": True}
+
+
+class NestedLoadSchema(Schema):
+    id = fields.Int(required=True)
+
+
+class CompiledLoadSchema(Schema):
+    id = fields.Int(required=True)
+    name = fields.Str(data_key="Name", validate=validate.Length(max=5))
+    score = fields.Float(allow_none=True)
+    active = fields.Bool(load_default=False)
+    flag = fields.Bool(truthy={"y"}, falsy={"n"})
+    tags = fields.List(fields.Str(), load_default=list)
+    extra = fields.Raw()
+    city = fields.Str(attribute="address.city")
+    image = ma_fields.File(
+        validate=[
+            FileSize(min="2 B", max="1 KiB", max_inclusive=False),
+            FileType([".png"]),
+        ]
+    )
+    nested = fields.Nested(NestedLoadSchema)
+
+
+def _file(content=b"abc", filename="a.png"):
+    return FileStorage(io.BytesIO(content), filename)
+
+
+COMPILED_LOAD_DATA = [
+    {"id": 1},
+    {"id": "2", "Name": "abc", "score": 1, "active": True, "flag": "y"},
+    {"id": 3, "score": None, "tags": ["a"], "extra": {"x": 1}, "city": "Paris"},
+    {"id": 4, "image": _file(), "nested": {"id": 5}},
+    {"id": 5, "image": []},
+    {},
+    {"id": None},
+    {"id": True, "Name": "too long"},
+    {"id": 1, "flag": True},
+    {"id": 1, "image": _file(b"a")},
+    {"id": 1, "image": _file(b"a" * 1024)},
+    {"id": 1, "image": _file(filename="a.gif")},
+    {"id": 1, "image": "a.png"},
+    {"id": 1, "nested": {"id": "x"}},
+    {"id": 1, "unknown": 1},
+    [],
+]
+
+
+def _load_result(schema, data, **kwargs):
+    try:
+        return schema.load(data, **kwargs)
+    except ValidationError as error:
+        return error.messages, error.valid_data
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"partial": True},
+        {"partial": ("id",)},
+        {"unknown": EXCLUDE},
+        {"unknown": INCLUDE},
+        {"many": True},
+    ],
+)
+def test_compile_load(kwargs):
+    schema = CompiledLoadSchema()
+    compiled_schema = CompiledLoadSchema()
+    assert compiled_schema.compile_load()
+    for data in COMPILED_LOAD_DATA:
+        if kwargs.get("many"):
+            data = [data]
+        expected = _load_result(schema, data, **kwargs)
+        assert _load_result(compiled_schema, data, **kwargs) == expected
+
+
+def test_compile_load_fallback():
+    class DeserializeSchema(Schema):
+        id = fields.Int()
+
+        def _deserialize(self, data, **kwargs):
+            return {"deserialized": True}
+
+    schema = DeserializeSchema()
+    assert not schema.compile_load()
+    assert schema.load({"id": 1}) == {"deserialized": True}
+
+
+def test_fail_fast():
+    calls = []
+
+    class FailFastSchema(CompiledLoadSchema):
+        @validates_schema(skip_on_field_errors=False)
+        def check(self, data, **kwargs):
+            calls.append(data)
+
+    data = {"id": "x", "Name": "too long", "image": _file(b"a")}
+    with pytest.raises(ValidationError) as excinfo:
+        FailFastSchema().load(data)
+    all_errors = excinfo.value.messages
+    assert len(all_errors) == 3
+    assert calls
+
+    calls.clear()
+    for compiled in (False, True):
+        schema = FailFastSchema(fail_fast=True)
+        if compiled:
+            schema.compile_load()
+        with pytest.raises(ValidationError) as excinfo:
+            schema.load(data)
+        # Which error comes first depends on the field order, which marshmallow
+        # 3.0 doesn't keep for unordered schemas
+        ((field_name, messages),) = excinfo.value.messages.items()
+        assert messages == all_errors[field_name]
+        assert excinfo.value.valid_data is None
+        errors = schema.validate([{"id": 1}, {"id": 2, "Name": "too long"}], many=True)
+        assert errors == {1: {"Name": ["Longer than maximum length 5."]}}
+        # Passed explicitly: marshmallow 3.0 has no load_default
+        valid = {"id": 1, "active": False, "tags": []}
+        assert schema.load(valid) == valid
+    assert calls == [valid] * 2
+
+
+def test_get_schema(ma):
+    class PooledSchema(ma.Schema):
+        id = fields.Int()
+        name = fields.Str()
+
+    schema = ma.get_schema(PooledSchema, many=True, exclude=["name", "id"])
+    assert isinstance(schema, PooledSchema)
+    assert schema.many
+    assert ma.get_schema(PooledSchema, many=True, exclude=("id", "name")) is schema
+    assert ma.get_schema(PooledSchema, many=True) is not schema
+    assert ma.get_schema(PooledSchema, only=["id"]) is ma.get_schema(
+        PooledSchema, only=("id",)
+    )
+    assert ma.schemas.cache_info() == (2, 3, 128, 3)
+
+    with pytest.raises(TypeError):
+        ma.get_schema(PooledSchema, context={})
+
+    # Changing the declared fields invalidates the cached instances
+    PooledSchema._declared_fields = {
+        **PooledSchema._declared_fields,
+        "email": fields.Str(),
+    }
+    assert "email" in ma.get_schema(PooledSchema, many=True).fields
+
+    ma.schemas.maxsize = 2
+    ma.get_schema(PooledSchema, many=False)
+    assert ma.schemas.cache_info().currsize == 2
+    ma.schemas.clear()
+    assert ma.schemas.cache_info() == (0, 0, 2, 0)
+
+
+def test_warm_up(app, ma, schemas, caplog):
+    class ShelfSchema(ma.Schema):
+        books = ma.List(ma.Nested(schemas.BookSchema))
+        author = ma.Nested(schemas.AuthorSchema, only=("id",))
+        missing = ma.URLFor("not_registered_yet")
+
+    class ArgumentSchema(ma.Schema):
+        def __init__(self, required_argument, **kwargs):
+            super().__init__(**kwargs)
+
+    classes = registered_schemas()
+    assert ShelfSchema in classes
+    assert Schema not in classes
+
+    report = ma.warm_up(
+        app, [ShelfSchema, schemas.AuthorSchema, schemas.BookSchema, ArgumentSchema]
+    )
+    assert report.schemas == 3
+    # The BookSchema in ShelfSchema and the AuthorSchemas in both BookSchemas
+    # and in ShelfSchema
+    assert report.nested == 4
+    assert report.endpoints == 4
+    assert list(report.errors) == [ArgumentSchema]
+    assert set(report.timings) == {"collect", "instantiate", "nested", "urls"}
+    assert "Couldn't warm up" in caplog.text
+    assert ma.get_schema(ShelfSchema) is ma.get_schema(ShelfSchema)
+    assert ma.schemas.cache_info().hits == 2
+
+    warm_app = Flask("warm")
+    warm_app.config["MARSHMALLOW_WARM_UP"] = True
+    assert Marshmallow(warm_app).schemas.cache_info().currsize > 0
+
+
+def test_freeze(app, ma, schemas, mockbook):
+    book_schema = ma.get_schema(schemas.BookSchema)
+    books_schema = ma.get_schema(schemas.BookSchema, many=True)
+    expected = book_schema.dump(mockbook)
+    expected_json = books_schema.jsonify([mockbook]).get_data()
+
+    try:
+        report = ma.freeze(app, gc_freeze=True)
+        assert report.gc_frozen > 0
+    finally:
+        gc.unfreeze()
+    # Both BookSchemas and the AuthorSchemas nested in them
+    assert report.schemas == 4
+    assert report.fields == 16
+    assert not report.errors
+    assert ma.freeze(app).schemas == 0
+
+    nested = book_schema.fields["author"].schema
+    for schema in (book_schema, nested):
+        with pytest.raises(TypeError):
+            schema.fields["title"] = fields.Str()
+        with pytest.raises(TypeError):
+            schema.dump_fields["title"] = fields.Str()
+    assert book_schema.dump(mockbook) == expected
+    assert books_schema.jsonify([mockbook]).get_data() == expected_json
+    assert book_schema.load({"title": "Fight Club"}) == {"title": "Fight Club"}
+    assert book_schema.sparse(fields=["title"]).dump(mockbook) == {
+        "title": mockbook.title
+    }
+
+
+def test_freeze_reports_unresolved_nested_schemas(app, ma, caplog):
+    class UnresolvedSchema(ma.Schema):
+        id = fields.Int()
+        other = fields.Nested("NotRegisteredSchema")
+
+    ma.get_schema(UnresolvedSchema)
+    report = ma.freeze(app)
+    assert report.schemas == 1
+    assert list(report.errors) == [UnresolvedSchema]
+    assert "1 errors" in str(report)
+    assert "Couldn't freeze the nested schemas of" in caplog.text
+
+
+def test_sparse(app, schemas, mockbook):
+    schema = schemas.BookSchema()
+    assert schema.sparse() is schema
+
+    variant = schema.sparse(fields=["title", "author.name"], exclude=["links"])
+    assert variant.dump(mockbook) == {
+        "title": mockbook.title,
+        "author": {"name": mockbook.author.name},
+    }
+    assert schema.sparse(exclude=["links"], fields=["author.name", "title"]) is variant
+
+    with app.test_request_context(
+        "/?fields=id,author&fields=title&exclude=author.links"
+    ):
+        result = schema.sparse().dump(mockbook)
+    assert set(result) == {"id", "title", "author"}
+    assert set(result["author"]) == {"id", "name", "absolute_url"}
+
+    with pytest.raises(ValidationError) as excinfo:
+        schema.sparse(fields=["id", "nope", "id.nope", "author.nope"], exclude=["x"])
+    assert excinfo.value.messages == {
+        "fields": {
+            "nope": ["Unknown field."],
+            "id.nope": ["Unknown field."],
+            "author.nope": ["Unknown field."],
+        },
+        "exclude": {"x": ["Unknown field."]},
+    }
+
+
+def test_sparse_keeps_schema_options():
+    schema = CompiledSchema(many=True, only=("id", "name", "score"), fail_fast=True)
+    schema.compile_dump()
+    variant = schema.sparse(fields=["score", "Name"])
+    assert variant.many and variant.fail_fast
+    assert variant._compiled_dump is not None
+    keys = list(variant.dump([FUSED_OBJS[0]])[0])
+    # marshmallow 3.0 only keeps the field order of ordered schemas
+    if schema.set_class is set:
+        keys.sort()
+    assert keys == ["Name", "score"]
+    with pytest.raises(ValidationError):
+        schema.sparse(fields=["active"])
+
+    schema = CompiledSchema()
+    keys = [field.data_key or name for name, field in schema.dump_fields.items()]
+    for names in itertools.islice(
+        itertools.combinations(keys, 2), SPARSE_CACHE_SIZE + 1
+    ):
+        schema.sparse(fields=names)
+    assert schema._sparse_variants.cache_info().currsize == SPARSE_CACHE_SIZE
@@ -0,0 +1,121 @@
+import datetime as dt
+import decimal
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from flask_marshmallow import Marshmallow
+from flask_marshmallow.encoding import (
+    JSONBackend,
+    get_json_backend,
+    make_json_backend,
+    set_json_backend,
+)
+
+DATA = {
+    "b": [1, 2.5, None, True],
+    "a": "é",
+    "when": dt.datetime(2024, 1, 2, 3, 4, 5),
+    "amount": decimal.Decimal("1.10"),
+    "nested": {2: "two", 3: {}},
+}
+
+
+@pytest.fixture
+def encapp():
+    return Flask("encapp")
+
+
+def test_json_encoder_is_disabled_by_default(encapp):
+    Marshmallow(encapp)
+    assert get_json_backend(encapp) is None
+
+
+def test_stdlib_backend_matches_jsonify(encapp):
+    encapp.config["MARSHMALLOW_JSON_ENCODER"] = "json"
+    ma = Marshmallow(encapp)
+
+    class Schema(ma.Schema):
+        data = ma.Raw()
+
+    assert get_json_backend(encapp).name == "json"
+    with encapp.test_request_context():
+        resp = Schema().jsonify({"data": DATA})
+        assert resp.get_data() == jsonify({"data": DATA}).get_data()
+        assert resp.mimetype == "application/json"
+
+
+def test_orjson_backend(encapp):
+    pytest.importorskip("orjson")
+    ma = Marshmallow()
+    ma.init_app(encapp, json_encoder="orjson")
+
+    class Schema(ma.Schema):
+        data = ma.Raw()
+
+    with encapp.test_request_context():
+        resp = Schema().jsonify({"data": DATA})
+        expected = jsonify({"data": DATA})
+    assert resp.get_data().endswith(b"\n")
+    assert resp.get_data().decode().index('"a"') < resp.get_data().decode().index('"b"')
+    assert json.loads(resp.get_data()) == json.loads(expected.get_data())
+
+
+def test_backend_falls_back_to_provider(encapp):
+    def dumps(data):
+        if isinstance(data, dict):
+            raise TypeError("unsupported")
+        return b"fast"
+
+    backend = set_json_backend(encapp, dumps)
+    with encapp.app_context():
+        assert backend.dumps([1]) == b"fast"
+        assert backend.dumps({"a": 1}) == encapp.json.dumps({"a": 1}).encode()
+
+
+def test_make_json_backend(encapp):
+    backend = make_json_backend(encapp, json)
+    assert isinstance(backend, JSONBackend)
+    assert make_json_backend(encapp, backend) is backend
+    with encapp.app_context():
+        assert backend.dumps({"a": 1}) == b'{"a": 1}'
+    with pytest.raises(TypeError):
+        make_json_backend(encapp, object())
+    set_json_backend(encapp, backend)
+    set_json_backend(encapp, None)
+    assert get_json_backend(encapp) is None
+
+
+def test_streaming_uses_backend(encapp):
+    ma = Marshmallow(encapp)
+
+    class Schema(ma.Schema):
+        a = ma.Int()
+
+    encoded = []
+
+    def dumps(data):
+        encoded.append(data)
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    set_json_backend(encapp, dumps)
+    items = [{"a": 1}, {"a": 2}]
+    with encapp.test_request_context():
+        resp = Schema().jsonify_stream(items, batch_size=1)
+        assert resp.get_data() == b'[{"a":1},{"a":2}]\n'
+        resp = Schema().jsonify_lines(items)
+        assert resp.get_data() == b'{"a":1}\n{"a":2}\n'
+    assert encoded == items * 2
+
+
+def test_jsonify_uses_flask_when_pretty_printing(encapp):
+    encapp.debug = True
+    ma = Marshmallow()
+    ma.init_app(encapp, json_encoder="json")
+
+    class Schema(ma.Schema):
+        a = ma.Int()
+
+    with encapp.test_request_context():
+        assert Schema().jsonify({"a": 1}).get_data() == jsonify({"a": 1}).get_data()
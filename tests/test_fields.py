@@ -5,10 +5,12 @@ import pytest
 from flask import url_for
 from marshmallow import missing
 from marshmallow.exceptions import ValidationError
+from marshmallow.utils import get_value
 from werkzeug.datastructures import FileStorage
 from werkzeug.routing import BuildError
 
-from flask_marshmallow.fields import _tpl
+import flask_marshmallow.fields
+from flask_marshmallow.fields import _make_getter, _make_value_getter, _tpl
 
 
 @pytest.mark.parametrize(
@@ -57,6 +59,51 @@ def test_url_field_handles_none_attribute(ma, mockbook, mockauthor):
     assert result is None
 
 
+@pytest.mark.parametrize(
+    "key", ["id", "author", "author.id", "author.missing", "missing.id", "0"]
+)
+@pytest.mark.parametrize("as_dict", [True, False])
+def test_make_getter_matches_get_value(mockbook, key, as_dict):
+    obj = dict(mockbook) if as_dict else mockbook
+    assert _make_getter(key)(obj) == get_value(obj, key)
+    assert _make_value_getter(key)(obj) == get_value(obj, key)
+
+
+def test_make_getter_stops_at_none(mockbook):
+    mockbook.author = None
+    assert _make_getter("author.id")(mockbook) is None
+    assert _make_value_getter("author.id")(mockbook) is missing
+
+
+def test_url_field_values_are_compiled(ma, mockauthor):
+    field = ma.URLFor("author", values={"id": "<id>", "q": "search", "_external": True})
+    assert field._url_external is True
+    assert field._url_plan == (("id", "id", True), ("q", "search", False))
+    assert [attr_name for attr_name, _ in field._url_getters] == ["id"]
+    result = field.serialize("url", mockauthor)
+    assert result == url_for("author", id=mockauthor.id, q="search", _external=True)
+
+
+def test_static_url_field_is_memoized_per_request(ma, app, mockauthorlist, monkeypatch):
+    calls = []
+    original_build_url = flask_marshmallow.fields.build_url
+
+    def build_url(*args):
+        calls.append(args)
+        return original_build_url(*args)
+
+    field = ma.URLFor("authors", values={"page": 1})
+    monkeypatch.setattr("flask_marshmallow.fields.build_url", build_url)
+    for author in mockauthorlist:
+        assert field.serialize("url", author) == url_for("authors", page=1)
+    assert ma.URLFor("authors", values={"page": 1}).serialize("url", None)
+    assert len(calls) == 1
+
+    with app.test_request_context(base_url="https://example.com/app/"):
+        assert field.serialize("url", None) == "/app/authors/?page=1"
+    assert len(calls) == 2
+
+
 def test_url_field_deserialization(ma):
     field = ma.URLFor("author", values=dict(id="<not-an-attr>"), allow_none=True)
     # noop
@@ -118,6 +165,58 @@ def test_hyperlinks_field_recurses_into_list(ma, mockauthor):
     ]
 
 
+def test_hyperlinks_field_builds_new_containers(ma, mockauthor):
+    field = ma.Hyperlinks(
+        {
+            "self": ma.URLFor("author", values={"id": "<id>"}),
+            "meta": {"tags": ("a", "b"), "title": "The author"},
+        }
+    )
+    first = field.serialize("_links", mockauthor)
+    second = field.serialize("_links", mockauthor)
+    assert first == {
+        "self": url_for("author", id=mockauthor.id),
+        "meta": {"tags": ["a", "b"], "title": "The author"},
+    }
+    assert first == second
+    assert first["meta"] is not second["meta"]
+    assert first["meta"]["tags"] is not second["meta"]["tags"]
+
+
+def test_hyperlinks_field_resolves_shared_attributes_once(ma, mockauthor):
+    class CountingAuthor:
+        lookups = 0
+
+        @property
+        def id(self):
+            self.lookups += 1
+            return mockauthor.id
+
+    field = ma.Hyperlinks(
+        {
+            "self": ma.URLFor("author", values={"id": "<id>"}),
+            "absolute": ma.AbsoluteURLFor("author", values={"id": "<id>"}),
+        }
+    )
+    obj = CountingAuthor()
+    result = field.serialize("_links", obj)
+    assert result == {
+        "self": url_for("author", id=mockauthor.id),
+        "absolute": url_for("author", id=mockauthor.id, _external=True),
+    }
+    assert obj.lookups == 1
+
+
+def test_hyperlinks_field_with_custom_url_field(ma, mockauthor):
+    class UpperURLFor(ma.URLFor):
+        def _serialize(self, value, key, obj):
+            return super()._serialize(value, key, obj).upper()
+
+    field = ma.Hyperlinks({"self": UpperURLFor("author", values={"id": "<id>"})})
+    result = field.serialize("_links", mockauthor)
+    assert result == {"self": url_for("author", id=mockauthor.id).upper()}
+
+
 def test_hyperlinks_field_deserialization(ma):
     field = ma.Hyperlinks(
         {"href": ma.URLFor("author", values={"id": "<id>"})}, allow_none=True
@@ -178,3 +277,14 @@ def test_config_field(ma, app, mockauthor):
     field = ma.Config(key="DOES_NOT_EXIST")
     with pytest.raises(ValueError, match="not found in the app config"):
         field.serialize("config_value", mockauthor)
+
+
+def test_config_field_is_memoized_per_request(ma, app, mockauthor):
+    app.config["NAME"] = "test"
+    field = ma.Config(key="NAME")
+    assert field.serialize("config_value", mockauthor) == "test"
+
+    app.config["NAME"] = "changed"
+    assert field.serialize("config_value", mockauthor) == "test"
+    with app.test_request_context():
+        assert field.serialize("config_value", mockauthor) == "changed"
@@ -0,0 +1,269 @@
+import pytest
+from flask import Flask, url_for
+
+from flask_marshmallow import Marshmallow
+from flask_marshmallow.routing import (
+    URLBuilder,
+    URLCache,
+    URLMatcher,
+    build_url,
+    enable_url_cache,
+    get_url_adapter,
+    get_url_builder,
+    get_url_cache,
+    get_url_matcher,
+)
+
+
+@pytest.fixture
+def routingapp():
+    app = Flask("routingapp")
+
+    @app.route("/item/<int:id>/<name>")
+    def item(id, name):
+        return ""
+
+    @app.route("/files/<path:filename>")
+    def files(filename):
+        return ""
+
+    @app.route("/static-route")
+    def static_route():
+        return ""
+
+    @app.route("/page/", defaults={"num": 1})
+    @app.route("/page/<int:num>")
+    def page(num):
+        return ""
+
+    @app.route("/sub", subdomain="api")
+    def on_subdomain():
+        return ""
+
+    return app
+
+
+@pytest.mark.parametrize(
+    ("endpoint", "values"),
+    [
+        ("item", {"id": 1, "name": "foo"}),
+        ("item", {"id": 2, "name": "a b/c?d"}),
+        ("files", {"filename": "a/b c.txt"}),
+        ("static_route", {}),
+    ],
+)
+@pytest.mark.parametrize("external", [None, False, True])
+@pytest.mark.parametrize("base_url", ["http://localhost/", "https://example.com/app/"])
+def test_build_url_matches_url_for(routingapp, endpoint, values, external, base_url):
+    with routingapp.test_request_context(base_url=base_url):
+        assert get_url_builder(routingapp, endpoint) is not None
+        expected = url_for(endpoint, _external=external, **values)
+        assert build_url(endpoint, values, external) == expected
+
+
+def test_build_url_in_app_context(routingapp):
+    routingapp.config["SERVER_NAME"] = "example.com"
+    with routingapp.app_context():
+        expected = url_for("item", id=1, name="foo")
+        assert build_url("item", {"id": 1, "name": "foo"}) == expected
+        assert expected.startswith("http://example.com/")
+
+
+@pytest.mark.parametrize("endpoint", ["page", "on_subdomain", "missing"])
+def test_uncompilable_rules(routingapp, endpoint):
+    with routingapp.test_request_context():
+        assert get_url_builder(routingapp, endpoint) is None
+
+
+def test_build_url_falls_back_to_url_for(routingapp):
+    with routingapp.test_request_context():
+        assert build_url("page", {}) == url_for("page")
+        assert build_url("page", {"num": 3}) == url_for("page", num=3)
+        # Unknown values are appended to the query string
+        values = {"id": 1, "name": "foo", "q": "bar"}
+        assert build_url("item", values) == url_for("item", **values)
+        values = {"_scheme": "https"}
+        assert build_url("static_route", values, True) == url_for(
+            "static_route", _external=True, **values
+        )
+
+
+def test_build_url_respects_url_defaults(routingapp):
+    @routingapp.url_defaults
+    def add_name(endpoint, values):
+        values.setdefault("name", "default")
+
+    with routingapp.test_request_context():
+        assert build_url("item", {"id": 1}) == "/item/1/default"
+
+
+def test_builders_are_rebuilt_when_url_map_changes(routingapp):
+    with routingapp.test_request_context():
+        builder = get_url_builder(routingapp, "item")
+        assert get_url_builder(routingapp, "item") is builder
+
+        routingapp.add_url_rule("/other/<int:id>", "item_other")
+        assert get_url_builder(routingapp, "item") is not builder
+
+        # A second rule for the same endpoint can't be compiled
+        routingapp.add_url_rule("/item/<int:id>", "item")
+        assert get_url_builder(routingapp, "item") is None
+    with routingapp.test_request_context():
+        assert build_url("item", {"id": 1}) == url_for("item", id=1)
+
+
+def test_url_builder_build_path(routingapp):
+    builder = URLBuilder.compile(next(routingapp.url_map.iter_rules("item")))
+    assert builder.build_path({"id": 5, "name": "x"}) == "/item/5/x"
+    assert builder.build_path({"id": 5}) is None
+    assert builder.build_path({"id": 5, "name": None}) is None
+
+
+def test_url_cache_is_disabled_by_default(routingapp):
+    Marshmallow(routingapp)
+    assert get_url_cache(routingapp) is None
+
+
+def test_url_cache_configured_through_init_app(routingapp):
+    routingapp.config["MARSHMALLOW_URL_CACHE_SIZE"] = 2
+    Marshmallow(routingapp)
+    url_cache = get_url_cache(routingapp)
+    assert isinstance(url_cache, URLCache)
+    assert url_cache.maxsize == 2
+
+    with routingapp.test_request_context():
+        for _ in range(3):
+            assert build_url("item", {"id": 1, "name": "a"}) == "/item/1/a"
+        assert build_url("item", {"id": 1, "name": "a"}, True) == (
+            "http://localhost/item/1/a"
+        )
+        assert url_cache.cache_info() == (2, 2, 2, 2)
+
+        # Least recently used URL is evicted
+        assert build_url("item", {"id": 2, "name": "b"}) == "/item/2/b"
+        assert build_url("item", {"id": 1, "name": "a"}, True) == (
+            "http://localhost/item/1/a"
+        )
+        assert url_cache.cache_info() == (3, 3, 2, 2)
+        assert build_url("item", {"id": 1, "name": "a"}) == "/item/1/a"
+        assert url_cache.cache_info() == (3, 4, 2, 2)
+
+    with routingapp.test_request_context(base_url="https://example.com/app/"):
+        assert build_url("item", {"id": 1, "name": "a"}) == "/app/item/1/a"
+        assert build_url("item", {"id": 1, "name": "a"}, True) == (
+            "https://example.com/app/item/1/a"
+        )
+
+    url_cache.clear()
+    assert url_cache.cache_info() == (0, 0, 2, 0)
+
+    routingapp.config["MARSHMALLOW_URL_CACHE_SIZE"] = 0
+    Marshmallow(routingapp)
+    assert get_url_cache(routingapp) is None
+
+
+def test_url_cache_is_cleared_when_url_map_changes(routingapp):
+    url_cache = enable_url_cache(routingapp, 10)
+    with routingapp.test_request_context():
+        build_url("item", {"id": 1, "name": "a"})
+        assert url_cache.cache_info().currsize == 1
+
+        routingapp.add_url_rule("/item/<int:id>", "item")
+        assert build_url("item", {"id": 1, "name": "a"}) == url_for(
+            "item", id=1, name="a"
+        )
+        assert url_cache.cache_info().currsize == 1
+        assert url_cache.cache_info().hits == 0
+
+
+def test_url_cache_keys_include_value_types(routingapp):
+    url_cache = enable_url_cache(routingapp, 10)
+    with routingapp.test_request_context():
+        for name in (True, 1, 1.0):
+            values = {"id": 1, "name": name}
+            assert build_url("item", values) == url_for("item", **values)
+    assert url_cache.cache_info().currsize == 3
+
+
+def test_url_cache_skips_unhashable_values(routingapp):
+    url_cache = enable_url_cache(routingapp, 10)
+    with routingapp.test_request_context():
+        values = {"id": 1, "name": "a", "tags": ["x", "y"]}
+        assert build_url("item", values) == url_for("item", **values)
+    assert url_cache.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize(
+    ("endpoint", "path", "expected"),
+    [
+        ("item", "/item/1/foo", {"id": 1, "name": "foo"}),
+        ("item", "/item/x/foo", None),
+        ("item", "/item/1/foo/", None),
+        ("item", "/items/1/foo", None),
+        ("files", "/files/a/b.txt", {"filename": "a/b.txt"}),
+        ("static_route", "/static-route", {}),
+    ],
+)
+def test_url_matcher(routingapp, endpoint, path, expected):
+    matcher = get_url_matcher(routingapp, endpoint)
+    assert isinstance(matcher, URLMatcher)
+    assert matcher.match(path) == expected
+    if expected is not None:
+        assert get_url_adapter(routingapp).match(path) == (endpoint, expected)
+
+
+def test_url_matcher_memoizes_results(routingapp):
+    matcher = get_url_matcher(routingapp, "item")
+    first = matcher.match("/item/1/foo")
+    assert matcher.match("/item/1/foo") is first
+    assert matcher._cached_match.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("endpoint", ["page", "on_subdomain", "missing"])
+def test_uncompilable_matchers(routingapp, endpoint):
+    assert get_url_matcher(routingapp, endpoint) is None
+
+
+def test_url_matcher_respects_rule_priority(routingapp):
+    routingapp.add_url_rule("/nodes/<id>", "node_detail")
+    routingapp.add_url_rule("/nodes/new", "node_new")
+    routingapp.add_url_rule("/nodes/", "node_list")
+    routingapp.add_url_rule("/nodes/<int:id>/children", "node_children")
+    routingapp.add_url_rule("/nodes/<id>", "node_delete", methods=["DELETE"])
+    routingapp.add_url_rule("/tree/<path:path>", "tree")
+    routingapp.add_url_rule("/tree/<id>/<int:num>", "tree_node")
+    assert get_url_adapter(routingapp).match("/nodes/new") == ("node_new", {})
+
+    # "/nodes/new" matches both rules; the URL map decides
+    for endpoint in ("node_detail", "node_new", "tree", "tree_node"):
+        assert get_url_matcher(routingapp, endpoint) is None
+    for endpoint in ("node_list", "node_children"):
+        assert isinstance(get_url_matcher(routingapp, endpoint), URLMatcher)
+
+
+def test_rules_without_trace_fall_back_to_url_map(routingapp):
+    # Werkzeug versions that don't keep the parsed rules in these attributes
+    for rule in routingapp.url_map.iter_rules():
+        del rule._trace
+    with routingapp.test_request_context():
+        assert get_url_builder(routingapp, "item") is None
+        assert build_url("item", {"id": 1, "name": "foo"}) == "/item/1/foo"
+    assert get_url_matcher(routingapp, "item") is None
+    assert get_url_adapter(routingapp).match("/item/1/foo") == (
+        "item",
+        {"id": 1, "name": "foo"},
+    )
+    assert "flask-marshmallow.compiled_url_map" in routingapp.extensions
+
+
+def test_url_adapter_is_cached_per_url_map(routingapp):
+    adapter = get_url_adapter(routingapp)
+    assert get_url_adapter(routingapp) is adapter
+    assert adapter.match("/item/1/foo") == ("item", {"id": 1, "name": "foo"})
+
+    routingapp.add_url_rule("/other/<int:id>", "other")
+    assert get_url_adapter(routingapp) is not adapter
+    assert get_url_adapter(routingapp).match("/other/1") == (
+        "other",
+        {"id": 1},
+    )
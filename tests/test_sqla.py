@@ -1,11 +1,15 @@
+import marshmallow as ma
 import pytest
+import sqlalchemy as sa
 from flask import Flask, url_for
 from flask_sqlalchemy import SQLAlchemy
 from marshmallow import ValidationError
+from marshmallow_sqlalchemy import ModelConverter
 from werkzeug.wrappers import Response
 
 from flask_marshmallow import Marshmallow
-from flask_marshmallow.sqla import HyperlinkRelated
+from flask_marshmallow.encoding import set_json_backend
+from flask_marshmallow.sqla import HyperlinkRelated, HyperlinkRelatedList
 from tests.conftest import Bunch
 
 try:
@@ -286,3 +290,554 @@ class TestSQLAlchemy:
 
         deserialized = author_schema.load(author_result)
         assert deserialized["books"][0] == book
+
+    @pytest.fixture
+    def count_queries(self, db):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sa.event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        yield statements
+        sa.event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    @requires_sqlalchemyschema
+    def test_batch_related_load(self, extma, models, db, count_queries):
+        class AuthorSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Author
+                batch_related = True
+
+            name = extma.auto_field()
+            books = extma.List(HyperlinkRelated("book"))
+
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+                batch_related = True
+
+            title = extma.auto_field()
+            author = extma.auto_field()
+
+        authors = [models.Author(name=f"Author {i}") for i in range(3)]
+        books = [
+            models.Book(title=f"Book {i}", author=authors[i % 3]) for i in range(6)
+        ]
+        db.session.add_all(authors + books)
+        db.session.commit()
+        payload = [
+            {"name": author.name, "books": [book.url for book in author.books]}
+            for author in authors
+        ]
+        book_ids = [[book.id for book in author.books] for author in authors]
+        book_payload = [{"title": "New", "author": author.id} for author in authors]
+        db.session.expunge_all()
+        del authors, books
+
+        count_queries.clear()
+        result = AuthorSchema(many=True).load(payload)
+        assert [[book.id for book in item["books"]] for item in result] == book_ids
+        assert len([s for s in count_queries if "FROM book" in s]) == 1
+
+        db.session.expunge_all()
+        count_queries.clear()
+        result = BookSchema().load(book_payload, many=True)
+        assert [item["author"].id for item in result] == [1, 2, 3]
+        assert len([s for s in count_queries if "FROM author" in s]) == 1
+
+    @requires_sqlalchemyschema
+    def test_batch_related_load_is_opt_in(self, extma, models, db, count_queries):
+        class AuthorSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Author
+
+            books = extma.List(HyperlinkRelated("book"))
+
+        author = models.Author(name="Chuck Paluhniuk")
+        books = [models.Book(title=f"Book {i}", author=author) for i in range(2)]
+        db.session.add_all([author, *books])
+        db.session.commit()
+        payload = {"books": [book.url for book in books]}
+        db.session.expunge_all()
+        del author, books
+
+        count_queries.clear()
+        AuthorSchema().load(payload)
+        assert len([s for s in count_queries if "FROM book" in s]) == 2
+
+    @requires_sqlalchemyschema
+    def test_hyperlink_related_field_uses_foreign_key(
+        self, extma, models, db, count_queries
+    ):
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            author = extma.HyperlinkRelated("author")
+
+        authors = [models.Author(name=f"Author {i}") for i in range(3)]
+        db.session.add_all(
+            [models.Book(title=f"Book {i}", author=authors[i]) for i in range(3)]
+            + [models.Book(title="No author")]
+        )
+        db.session.commit()
+        expected = [author.url for author in authors] + [None]
+        db.session.expunge_all()
+
+        books = db.session.query(models.Book).order_by(models.Book.id).all()
+        count_queries.clear()
+        result = BookSchema(many=True).dump(books)
+        assert [item["author"] for item in result] == expected
+        assert count_queries == []
+
+        # A loaded relationship takes precedence over the foreign key
+        books[0].author = books[1].author
+        assert BookSchema().dump(books[0])["author"] == expected[1]
+
+    @requires_sqlalchemyschema
+    def test_hyperlink_related_list(self, extma, models, db, count_queries):
+        class AuthorSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Author
+
+            name = extma.auto_field()
+            books = extma.HyperlinkRelatedList("book")
+
+        authors = [models.Author(name=f"Author {i}") for i in range(3)]
+        db.session.add_all(authors)
+        db.session.add_all(
+            [models.Book(title=f"Book {i}", author=authors[i % 2]) for i in range(5)]
+        )
+        db.session.commit()
+        expected = [[book.url for book in author.books] for author in authors]
+        assert expected[2] == []
+        db.session.expunge_all()
+
+        authors = db.session.query(models.Author).order_by(models.Author.id).all()
+        count_queries.clear()
+        result = AuthorSchema(many=True).dump(authors)
+        assert [item["books"] for item in result] == expected
+        assert len(count_queries) == 1
+        assert "FROM author JOIN book" in count_queries[0]
+
+        db.session.expunge_all()
+        authors = db.session.query(models.Author).order_by(models.Author.id).all()
+        count_queries.clear()
+        assert AuthorSchema(many=True).jsonify(authors).json == result
+        assert len(count_queries) == 1
+
+        count_queries.clear()
+        assert AuthorSchema().dump(authors[0])["books"] == expected[0]
+        assert len(count_queries) == 1
+
+        # Loaded relationships are used as-is
+        assert len(authors[1].books) == 2
+        count_queries.clear()
+        assert AuthorSchema().dump(authors[1])["books"] == expected[1]
+        assert count_queries == []
+
+        # Deserialization is the same as a list of HyperlinkRelated fields
+        loaded = AuthorSchema().load({"name": "New", "books": expected[0]})
+        assert [book.url for book in loaded["books"]] == expected[0]
+
+    @requires_sqlalchemyschema
+    def test_hyperlink_related_list_self_referential(
+        self, extma, models, db, extapp, count_queries
+    ):
+        class NodeModel(db.Model):
+            __tablename__ = "node"
+            id = db.Column(db.Integer, primary_key=True)
+            parent_id = db.Column(db.Integer, db.ForeignKey("node.id"))
+            children = db.relationship(
+                "NodeModel",
+                order_by="NodeModel.id.desc()",
+                backref=db.backref("parent", remote_side=[id]),
+            )
+
+        db.create_all()
+        extapp.add_url_rule("/node/<int:id>", "node", lambda id: "")
+
+        class NodeSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = NodeModel
+
+            id = extma.auto_field()
+            children = extma.HyperlinkRelatedList("node")
+
+        root, other = NodeModel(), NodeModel()
+        root.children = [NodeModel(), NodeModel()]
+        db.session.add_all([root, other])
+        db.session.commit()
+        db.session.expunge_all()
+
+        nodes = db.session.scalars(sa.select(NodeModel).order_by(NodeModel.id)).all()
+        count_queries.clear()
+        result = NodeSchema(many=True).dump(nodes)
+        assert result[0]["children"] == ["/node/4", "/node/3"]
+        assert [item["children"] for item in result[1:]] == [[], [], []]
+        assert len(count_queries) == 1
+        assert NodeSchema().dump(nodes[0]) == result[0]
+
+    @requires_sqlalchemyschema
+    def test_hyperlink_related_auto_schema(self, extma, models, db, count_queries):
+        class AuthorSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Author
+                include_relationships = True
+                hyperlink_related = {"books": "book"}
+
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_relationships = True
+                hyperlink_related = {"author": {"endpoint": "author", "external": True}}
+
+        assert isinstance(AuthorSchema().fields["books"], HyperlinkRelatedList)
+        assert isinstance(BookSchema().fields["author"], HyperlinkRelated)
+        assert BookSchema().fields["author"].external is True
+
+        author = models.Author(name="Chuck Paluhniuk")
+        book = models.Book(title="Fight Club", author=author)
+        db.session.add_all([author, book])
+        db.session.commit()
+        author_url, book_url, author_absolute_url = (
+            author.url,
+            book.url,
+            author.absolute_url,
+        )
+        db.session.expunge_all()
+
+        authors = db.session.query(models.Author).all()
+        books = db.session.query(models.Book).all()
+        count_queries.clear()
+        assert AuthorSchema(many=True).dump(authors)[0]["books"] == [book_url]
+        assert BookSchema(many=True).dump(books)[0]["author"] == author_absolute_url
+        assert len(count_queries) == 1
+        assert author_url in author_absolute_url
+
+    def test_hyperlink_related_requires_hyperlink_converter(self, extma, models):
+        class Converter(ModelConverter):
+            pass
+
+        with pytest.raises(ValueError, match="HyperlinkModelConverter"):
+
+            class AuthorSchema(extma.SQLAlchemyAutoSchema):
+                class Meta:
+                    model = models.Author
+                    model_converter = Converter
+                    hyperlink_related = {"books": "book"}
+
+    @pytest.fixture
+    def library(self, models, db):
+        authors = [models.Author(name=f"Author {i}") for i in range(3)]
+        books = [
+            models.Book(title=f"Book {i}", author=authors[i % 3]) for i in range(6)
+        ]
+        db.session.add_all(authors + books)
+        db.session.commit()
+        db.session.expunge_all()
+        return Bunch(authors=authors, books=books)
+
+    @requires_sqlalchemyschema
+    def test_optimize_query_nested(self, extma, models, db, library, count_queries):
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            id = extma.auto_field()
+            title = extma.auto_field()
+            # Nested doesn't take callables on marshmallow 3.0; the class name
+            # is unique so that the registry lookup isn't ambiguous
+            author = extma.Nested("OptimizedAuthorSchema", only=("name",))
+
+        class OptimizedAuthorSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Author
+
+            id = extma.auto_field()
+            name = extma.auto_field()
+            books = extma.List(extma.Nested(BookSchema, exclude=("author",)))
+
+        schema = OptimizedAuthorSchema(many=True)
+        query = schema.optimize_query(sa.select(models.Author))
+        result = schema.dump(db.session.scalars(query).all())
+        assert [len(item["books"]) for item in result] == [2, 2, 2]
+        assert len(count_queries) == 2
+
+        db.session.expunge_all()
+        count_queries.clear()
+        schema = BookSchema(many=True, only=("id", "author"))
+        query = schema.optimize_query(db.session.query(models.Book))
+        result = schema.dump(query.all())
+        assert result[0] == {"id": 1, "author": {"name": "Author 0"}}
+        assert len(count_queries) == 1
+        assert "JOIN author" in count_queries[0]
+        assert "book.title" not in count_queries[0]
+
+    @requires_sqlalchemyschema
+    def test_optimize_query_related(self, extma, models, db, library, count_queries):
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_relationships = True
+
+            author = extma.HyperlinkRelated("author")
+            _links = extma.Hyperlinks(
+                {"self": extma.URLFor("book", values={"id": "<id>"})}
+            )
+
+        class AuthorSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Author
+                include_relationships = True
+
+        schema = BookSchema(many=True, only=("author", "_links"))
+        query = schema.optimize_query(sa.select(models.Book))
+        result = schema.dump(db.session.scalars(query).all())
+        assert result[0] == {"author": "/author/1", "_links": {"self": "/book/1"}}
+        assert len(count_queries) == 1
+        assert "book.title" not in count_queries[0]
+
+        db.session.expunge_all()
+        count_queries.clear()
+        schema = AuthorSchema(many=True)
+        query = schema.optimize_query(sa.select(models.Author))
+        result = schema.dump(db.session.scalars(query).all())
+        assert [len(item["books"]) for item in result] == [2, 2, 2]
+        assert len(count_queries) == 2
+        assert "book.title" not in count_queries[1]
+
+    @requires_sqlalchemyschema
+    def test_optimize_query_unmapped_attributes(self, extma, models):
+        class AuthorSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Author
+
+            id = extma.auto_field()
+            url = extma.String()
+
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            title = extma.auto_field()
+
+        statement = str(AuthorSchema().optimize_query(sa.select(models.Author)))
+        assert "author.name" in statement
+        statement = str(
+            AuthorSchema(only=("id",)).optimize_query(sa.select(models.Author))
+        )
+        assert "author.name" not in statement
+        statement = str(BookSchema().optimize_query(sa.select(models.Book)))
+        assert "book.author_id" not in statement
+
+    @requires_sqlalchemyschema
+    def test_project_query(self, extma, models, db, library, count_queries):
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_fk = True
+
+        schema = BookSchema(many=True, only=("title",))
+        query = schema.project_query(sa.select(models.Book))
+        result = schema.dump(db.session.scalars(query).all())
+        assert result[0] == {"title": "Book 0"}
+        assert len(count_queries) == 1
+        assert "book.author_id" not in count_queries[0]
+        assert "book.title" in count_queries[0]
+
+    @requires_sqlalchemyschema
+    def test_sparse_narrows_query(self, extma, models, db, library, count_queries):
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_fk = True
+
+            author = extma.Nested(lambda: AuthorSchema())
+
+        class AuthorSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Author
+
+        schema = BookSchema(many=True, session=db.session)
+        variant = schema.sparse(fields=["title"])
+        assert variant.session is db.session
+        query = variant.optimize_query(sa.select(models.Book))
+        result = variant.dump(db.session.scalars(query).all())
+        assert result[0] == {"title": "Book 0"}
+        assert len(count_queries) == 1
+        assert "book.author_id" not in count_queries[0]
+        assert "JOIN" not in count_queries[0]
+
+    @requires_sqlalchemyschema
+    def test_warm_up_and_freeze(self, extma, models, db, extapp, library):
+        class AuthorSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Author
+
+            books = extma.HyperlinkRelatedList("book")
+
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                load_instance = True
+
+            author = extma.HyperlinkRelated("author")
+            editor = extma.Nested(AuthorSchema, only=("name",))
+
+        report = extma.warm_up(extapp, [BookSchema, AuthorSchema])
+        assert report.errors == {}
+        assert report.endpoints == 2
+        assert extma.freeze(extapp).schemas == 3
+
+        # Computed before workers are forked
+        author_schema = extma.get_schema(AuthorSchema)
+        assert "_loading_plan" in author_schema.__dict__
+        assert models.Author in author_schema.fields["books"]._key_queries
+        book_fields = extma.get_schema(BookSchema).fields
+        assert models.Book in book_fields["author"]._local_key_attrs
+
+        schema = extma.get_schema(BookSchema, exclude=("editor",))
+        book = db.session.scalars(sa.select(models.Book)).first()
+        data = extma.get_schema(BookSchema).dump(book)
+        assert data["author"] == book.author.url
+        query = schema.optimize_query(sa.select(models.Book))
+        assert len(db.session.scalars(query).all()) == len(library.books)
+        assert schema.load({"title": "New", "author": data["author"]}).author == (
+            book.author
+        )
+
+    @requires_sqlalchemyschema
+    def test_dump_loads_unloaded_columns_in_batches(
+        self, extma, models, db, library, count_queries
+    ):
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_fk = True
+
+        query = sa.select(models.Book).options(sa.orm.defer(models.Book.title))
+        books = db.session.scalars(query).all()
+        count_queries.clear()
+        result = BookSchema(many=True).dump(books)
+        assert sorted(item["title"] for item in result) == [
+            f"Book {i}" for i in range(6)
+        ]
+        assert len(count_queries) == 1
+
+        # Expired objects
+        db.session.expire_all()
+        count_queries.clear()
+        assert BookSchema(many=True).dump(books) == result
+        assert len(count_queries) == 1
+
+        # Columns that aren't dumped aren't loaded
+        db.session.expire_all()
+        count_queries.clear()
+        assert BookSchema(only=("id",)).dump(books[0]) == {"id": result[0]["id"]}
+        assert len(count_queries) == 1
+        assert "book.title" not in count_queries[0]
+
+    @requires_sqlalchemyschema
+    def test_dump_rows(self, extma, extapp, models, db, library, count_queries):
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            id = extma.auto_field()
+            title = extma.auto_field(data_key="name")
+            author = extma.HyperlinkRelated("author")
+            url = extma.URLFor("book", values={"id": "<id>"})
+            _links = extma.Hyperlinks(
+                {"author": extma.URLFor("author", values={"id": "<author_id>"})}
+            )
+            kind = extma.Method("get_kind")
+
+            def get_kind(self, row):
+                return f"book:{row.id}"
+
+        Book = models.Book
+        select = sa.select(Book.id, Book.title, Book.author_id).order_by(Book.id)
+        books = db.session.scalars(sa.select(Book).order_by(Book.id)).all()
+        expected = BookSchema(many=True).dump(books)
+        assert expected[0]["kind"] == "book:1"
+
+        count_queries.clear()
+        assert BookSchema().dump_rows(db.session.execute(select)) == expected
+        assert len(count_queries) == 1
+        rows = db.session.execute(select).all()
+        assert BookSchema().dump_rows(rows) == expected
+        assert BookSchema().dump_rows([]) == []
+
+        # Columns that aren't selected are omitted
+        rows = db.session.execute(sa.select(Book.id, Book.author_id)).all()
+        result = BookSchema(exclude=("url", "_links", "kind")).dump_rows(rows)
+        assert result[0] == {"id": expected[0]["id"], "author": expected[0]["author"]}
+
+        response = BookSchema().jsonify_rows(db.session.execute(select))
+        assert response.json == expected
+
+        encoded = []
+        set_json_backend(extapp, lambda data: encoded.append(data) or b"[]")
+        response = BookSchema().jsonify_rows(db.session.execute(select))
+        assert response.get_data() == b"[]\n"
+        assert encoded == [expected]
+
+    @requires_sqlalchemyschema
+    def test_dump_rows_with_hooks(self, extma, models, db, library):
+        class BookSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            title = extma.auto_field()
+
+            @ma.post_dump(pass_many=True)
+            def wrap(self, data, many, **kwargs):
+                return {"items": data}
+
+        rows = db.session.execute(sa.select(models.Book.title)).all()
+        result = BookSchema().dump_rows(rows)
+        assert len(result["items"]) == 6
+
+        class OriginalSchema(extma.SQLAlchemySchema):
+            class Meta:
+                model = models.Book
+
+            title = extma.auto_field()
+
+            @ma.post_dump(pass_original=True)
+            def add_length(self, data, original, **kwargs):
+                data["length"] = len(original.title)
+                return data
+
+        query = sa.select(models.Book.title).order_by(models.Book.id)
+        result = OriginalSchema().dump_rows(db.session.execute(query))
+        assert result[0] == {"title": "Book 0", "length": 6}
+        assert len(result) == 6
+
+    @requires_sqlalchemyschema
+    def test_jsonify_stream(self, extma, models, db, library):
+        class BookSchema(extma.SQLAlchemyAutoSchema):
+            class Meta:
+                model = models.Book
+                include_fk = True
+
+            url = extma.URLFor("book", values={"id": "<id>"})
+
+        Book = models.Book
+        schema = BookSchema()
+        expected = schema.dump(
+            db.session.scalars(sa.select(Book).order_by(Book.id)), many=True
+        )
+        for query in (
+            sa.select(Book).order_by(Book.id),
+            db.session.query(Book).order_by(Book.id),
+            sa.select(Book.id, Book.title, Book.author_id).order_by(Book.id),
+        ):
+            db.session.expunge_all()
+            response = schema.jsonify_stream(query, batch_size=4)
+            assert response.is_streamed
+            assert len(list(response.response)) == 4
+            response = schema.jsonify_stream(query, batch_size=4)
+            assert response.json == expected